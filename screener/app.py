@@ -1,4 +1,5 @@
 import streamlit as st
+from utils.warmup import get_warmer
 
 st.set_page_config(
     page_title="Peter Lynch Screener",
@@ -6,6 +7,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Start warming caches for the default universe before the first page asks
+get_warmer()
+
 st.sidebar.title("📊 Peter Lynch Screener")
 page = st.sidebar.radio("Navigate", [
     "🏠 Home",
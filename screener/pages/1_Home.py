@@ -1,10 +1,17 @@
 import streamlit as st 
 st.set_page_config(page_title="Peter Lynch Screener", layout="wide") 
+import numpy as np
 import pandas as pd
-import yfinance as yf
 import plotly.graph_objects as go
 from utils.data_loader import get_dow30_tickers, get_bulk_stock_data
+from utils.symbol_index import get_symbol_names
 from utils.lynch_scoring import score_lynch_criteria
+from utils.market_data import get_provider
+from utils.ticker_bundle import get_ticker_bundle
+from utils.warmup import show_warmup_status
+from utils.price_store import get_history
+from utils.indicators import indicator_frame
+from utils.downsample import downsample_line, downsample_ohlc, point_budget, volume_colors as volume_colors_for
 
 
 st.title("🏠 Peter Lynch Screener")
@@ -25,8 +32,8 @@ interval_map = {
     "5y": "1wk"
 }
 interval = interval_map[range_option]
-stock = yf.Ticker("^DJI")
-hist = stock.history(period=range_option, interval=interval)
+show_warmup_status()
+hist = get_history("^DJI", range_option, interval)
 
 # -------------------- KPI Metrics ----------------------
 # -------------------- KPI Metrics (based on selected range) ----------------------
@@ -38,7 +45,7 @@ latest_low = hist["Low"].min() if not hist.empty else "N/A"
 latest_close = hist["Close"].iloc[-1] if not hist.empty else "N/A"
 
 # 52W data still uses static info (not affected by range)
-info = stock.info
+info = get_ticker_bundle("^DJI").info
 fifty_two_week_high = info.get("fiftyTwoWeekHigh", "N/A")
 fifty_two_week_low = info.get("fiftyTwoWeekLow", "N/A")
 
@@ -60,29 +67,34 @@ st.subheader("📈 Dow Jones Chart")
 
 # Moving Averages (optional)
 if show_ma and not hist.empty:
-    hist["MA20"] = hist["Close"].rolling(window=20).mean()
-    hist["MA50"] = hist["Close"].rolling(window=50).mean()
+    ma = indicator_frame("^DJI", interval, [("sma", 20), ("sma", 50)])
+    hist["MA20"] = ma["sma_20"].reindex(hist.index)
+    hist["MA50"] = ma["sma_50"].reindex(hist.index)
+
+# Thin candles and overlays to what the chart can actually show
+budget = point_budget()
+candles = downsample_ohlc(hist[["Open", "High", "Low", "Close", "Volume"]], budget)
+ma_lines = {col: downsample_line(hist[col], budget) for col in ["MA20", "MA50"] if col in hist.columns}
 
 # Plot
 fig = go.Figure()
 
 # Candlestick
 fig.add_trace(go.Candlestick(
-    x=hist.index,
-    open=hist["Open"],
-    high=hist["High"],
-    low=hist["Low"],
-    close=hist["Close"],
+    x=candles.index,
+    open=candles["Open"],
+    high=candles["High"],
+    low=candles["Low"],
+    close=candles["Close"],
     name="Dow 30"
 ))
 
 # Volume with green for up candles and red for down candles
-volume_colors = ["green" if close >= open_ else "red"
-                    for open_, close in zip(hist["Open"], hist["Close"])]
+volume_colors = volume_colors_for(candles["Open"], candles["Close"])
 
 fig.add_trace(go.Bar(
-    x=hist.index,
-    y=hist["Volume"],
+    x=candles.index,
+    y=candles["Volume"],
     name="Volume",
     marker=dict(color=volume_colors),
     yaxis="y2",
@@ -94,16 +106,16 @@ fig.add_trace(go.Bar(
 # Add MAs
 if show_ma and "MA20" in hist.columns:
     fig.add_trace(go.Scatter(
-        x=hist.index,
-        y=hist["MA20"],
+        x=ma_lines["MA20"].index,
+        y=ma_lines["MA20"],
         mode="lines",
         name="20MA",
         line=dict(color="orange", width=1.5)
     ))
 if show_ma and "MA50" in hist.columns:
     fig.add_trace(go.Scatter(
-        x=hist.index,
-        y=hist["MA50"],
+        x=ma_lines["MA50"].index,
+        y=ma_lines["MA50"],
         mode="lines",
         name="50MA",
         line=dict(color="green", width=1.5)
@@ -135,33 +147,45 @@ Unlike other indices like the S&P 500 which are market-cap weighted, the DJIA is
 """)
 
 # -------------------- Top Gainers / Losers ----------------------
+@st.cache_data(ttl=60)
+def get_intraday_changes(tickers):
+    # One batched 1-minute request for the whole index instead of one per ticker
+    bars = get_provider().download(tickers, period="1d", interval="1m")
+    if bars.empty:
+        return pd.DataFrame(columns=["Ticker", "Company", "Open", "Close", "Change (%)"])
+
+    open_prices = bars["Open"].bfill().iloc[0]
+    close_prices = bars["Close"].ffill().iloc[-1]
+    percent_change = (close_prices - open_prices) / open_prices * 100
+    names = get_symbol_names(tickers)
+
+    change_df = pd.DataFrame({
+        "Ticker": percent_change.index,
+        "Company": [names.get(t, "N/A") for t in percent_change.index],
+        "Open": open_prices.round(2).to_numpy(),
+        "Close": close_prices.round(2).to_numpy(),
+        "Change (%)": percent_change.round(2).to_numpy()
+    })
+    return change_df.dropna(subset=["Change (%)"]).reset_index(drop=True)
+
+
+def top_k(df, column, k, largest=True):
+    # Partial sort: only the k selected rows get fully ordered
+    values = df[column].to_numpy(dtype=float)
+    k = min(k, len(values))
+    if k == 0:
+        return df.iloc[[]].reset_index(drop=True)
+    keys = -values if largest else values
+    idx = np.argpartition(keys, k - 1)[:k]
+    idx = idx[np.argsort(keys[idx], kind="stable")]
+    return df.iloc[idx].reset_index(drop=True)
+
 st.write("")
 st.write("")
 dow_tickers = get_dow30_tickers()
-changes = []
-
-for ticker in dow_tickers:
-    try:
-        t = yf.Ticker(ticker)
-        hist_today = t.history(period="1d", interval="1m")
-        if not hist_today.empty:
-            open_price = hist_today["Open"].iloc[0]
-            close_price = hist_today["Close"].iloc[-1]
-            percent_change = ((close_price - open_price) / open_price) * 100
-            changes.append({
-                "Ticker": ticker,
-                "Company": t.info.get("shortName", "N/A"),
-                "Open": round(open_price, 2),
-                "Close": round(close_price, 2),
-                "Change (%)": round(percent_change, 2)
-            })
-    except:
-        continue
-
-# Convert to DataFrame and sort
-change_df = pd.DataFrame(changes)
-gainers = change_df.sort_values("Change (%)", ascending=False).head(5).reset_index(drop=True)
-losers = change_df.sort_values("Change (%)").head(5).reset_index(drop=True)
+change_df = get_intraday_changes(dow_tickers)
+gainers = top_k(change_df, "Change (%)", 5, largest=True)
+losers = top_k(change_df, "Change (%)", 5, largest=False)
 
 # Display with emojis/icons
 col1, col2 = st.columns(2)
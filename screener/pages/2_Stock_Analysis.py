@@ -1,9 +1,16 @@
 import streamlit as st
-from utils.data_loader import get_dow30_tickers, get_stock_info
+from utils.ticker_bundle import get_ticker_bundle
+from utils.data_loader import get_published_row, records_to_frame
+from utils.analytics import TEN_BAGGER_TIERS, checklist_results, tier_points
+from utils.lynch_scoring import PEG_MAX
+from utils.symbol_index import ensure_symbols, get_symbol_index
+from utils.universes import select_universe
+from utils.warmup import show_warmup_status
 import plotly.graph_objects as go
 import numpy as np
 import pandas as pd
-import yfinance as yf
+from utils.indicators import indicator_frame
+from utils.downsample import downsample_line, downsample_ohlc, point_budget, volume_colors as volume_colors_for
 
 st.set_page_config(page_title="📈 Stock Analysis", layout="wide")
 st.title("📈 Stock Analysis")
@@ -23,27 +30,48 @@ interval_map = {
 }
 interval = interval_map[range_option]
 
+SEARCH_LIMIT = 10
+
 # ----------------- Ticker Selection by Company Name -----------------
 @st.cache_data(ttl=86400)
-def get_company_name_mapping():
-    mapping = {}
-    for ticker in get_dow30_tickers():
-        try:
-            name = yf.Ticker(ticker).info.get("shortName", ticker)
-            mapping[name] = ticker
-        except:
-            continue
-    return mapping
-
-company_to_ticker = get_company_name_mapping()
+def get_company_name_mapping(tickers):
+    # Labels come from the persisted symbol index, not one .info call per ticker
+    index = ensure_symbols(tickers)
+    return {index.name(t, t): t for t in tickers}
+
+universe = select_universe()
+show_warmup_status(universe["name"])
+company_to_ticker = get_company_name_mapping(universe["symbols"])
 company_names = sorted(company_to_ticker.keys())
+
+# Search as you type: ticker, company name or alias, with typos tolerated
+query = st.text_input("Search by ticker or company", placeholder="e.g. AAPL, apple, mcdonalds")
+if query:
+    # The index spans every universe seen, so over-fetch and keep this one's members
+    ticker_to_company = {t: name for name, t in company_to_ticker.items()}
+    found = get_symbol_index().search(query, limit=SEARCH_LIMIT * 5)
+    matches = [ticker_to_company[s] for s in found if s in ticker_to_company][:SEARCH_LIMIT]
+    if matches:
+        company_names = matches
+    else:
+        st.caption(f"No company in {universe['name']} matches \"{query}\".")
 selected_name = st.selectbox("Choose a company", company_names)
 ticker = company_to_ticker[selected_name]
 
 # ----------------- Fetch Stock Info -----------------
-info = get_stock_info(ticker)
-yf_info = yf.Ticker(ticker).info
-hist = yf.Ticker(ticker).history(period=range_option, interval=interval)
+# One shared fetch per ticker; every section below reads from this bundle
+bundle = get_ticker_bundle(ticker)
+info = bundle.fundamentals
+if info.get("status", "ok") != "ok":
+    st.warning(f"Could not load fundamentals for {ticker} ({info['status']}): {info['error']}")
+yf_info = bundle.info
+hist = bundle.history(range_option, interval)
+
+# Ten-bagger and checklist scores are precomputed for the whole universe;
+# read them from the published snapshot rather than loading the universe
+row = get_published_row(universe["symbols"], ticker)
+if row is None:
+    row = records_to_frame([info]).iloc[0]
 
 # ----------------- Company Overview -----------------
 st.subheader(f"{info.get('name', ticker)} ({ticker})")
@@ -77,25 +105,31 @@ st.write("")
 
 # Moving Averages
 if show_ma and not hist.empty:
-    hist["MA20"] = hist["Close"].rolling(window=20).mean()
-    hist["MA50"] = hist["Close"].rolling(window=50).mean()
+    ma = indicator_frame(ticker, interval, [("sma", 20), ("sma", 50)])
+    hist["MA20"] = ma["sma_20"].reindex(hist.index)
+    hist["MA50"] = ma["sma_50"].reindex(hist.index)
+
+# Thin candles and overlays to what the chart can actually show
+budget = point_budget()
+candles = downsample_ohlc(hist[["Open", "High", "Low", "Close", "Volume"]], budget)
+ma_lines = {col: downsample_line(hist[col], budget) for col in ["MA20", "MA50"] if col in hist.columns}
 
-volume_colors = ["green" if close >= open_ else "red" for open_, close in zip(hist["Open"], hist["Close"])]
+volume_colors = volume_colors_for(candles["Open"], candles["Close"])
 
 fig = go.Figure()
 
 fig.add_trace(go.Candlestick(
-    x=hist.index,
-    open=hist["Open"],
-    high=hist["High"],
-    low=hist["Low"],
-    close=hist["Close"],
+    x=candles.index,
+    open=candles["Open"],
+    high=candles["High"],
+    low=candles["Low"],
+    close=candles["Close"],
     name="Price"
 ))
 
 fig.add_trace(go.Bar(
-    x=hist.index,
-    y=hist["Volume"],
+    x=candles.index,
+    y=candles["Volume"],
     name="Volume",
     marker=dict(color=volume_colors),
     yaxis="y2",
@@ -106,16 +140,16 @@ fig.add_trace(go.Bar(
 # Add MAs
 if show_ma and "MA20" in hist.columns:
     fig.add_trace(go.Scatter(
-        x=hist.index,
-        y=hist["MA20"],
+        x=ma_lines["MA20"].index,
+        y=ma_lines["MA20"],
         mode="lines",
         name="20MA",
         line=dict(color="orange", width=1.5)
     ))
 if show_ma and "MA50" in hist.columns:
     fig.add_trace(go.Scatter(
-        x=hist.index,
-        y=hist["MA50"],
+        x=ma_lines["MA50"].index,
+        y=ma_lines["MA50"],
         mode="lines",
         name="50MA",
         line=dict(color="green", width=1.5)
@@ -155,22 +189,10 @@ st.subheader("Peter Lynch's Favorite Metric")
 # st.subheader("Peter Lynch's Favorite Metric")
 
 try:
-    pe_ratio = yf_info.get('trailingPE', None)
+    # Same PEG as the KPI row and the screener, derived once in data_loader
+    pe_ratio = info.get('pe_ratio', None)
     earnings_growth = yf_info.get('earningsGrowth', None) * 100 if yf_info.get('earningsGrowth') else None
-    forward_eps = yf_info.get('forwardEps', None)
-    current_eps = yf_info.get('trailingEps', None)
-    peg_from_api = yf_info.get('pegRatio', None)
-
-    # Calculate PEG manually if not available
-    if pe_ratio and earnings_growth and earnings_growth > 0:
-        peg_calculated = pe_ratio / earnings_growth
-    elif pe_ratio and current_eps and forward_eps and current_eps > 0:
-        projected_growth = ((forward_eps / current_eps) - 1) * 100
-        peg_calculated = pe_ratio / projected_growth if projected_growth > 0 else None
-    else:
-        peg_calculated = None
-
-    peg = peg_from_api if peg_from_api else peg_calculated
+    peg = bundle.peg_ratio
 
     col1, col2 = st.columns(2)
 
@@ -247,10 +269,9 @@ st.subheader("Can this stock 10x?")
 try:
     current_price = hist['Close'].iloc[-1]
     target_price = current_price * 10
-    revenue_growth = yf_info.get('revenueGrowth', 0) if yf_info.get('revenueGrowth') else 0
-    market_cap = yf_info.get('marketCap', 0)
-    profit_margin = yf_info.get('profitMargins', 0) if yf_info.get('profitMargins') else 0
-    inst_ownership = yf_info.get('heldPercentInstitutions', 0) if yf_info.get('heldPercentInstitutions') else 0
+    revenue_growth = np.nan_to_num(row["revenue_growth"])
+    profit_margin = np.nan_to_num(row["profit_margin"])
+    inst_ownership = np.nan_to_num(row["inst_ownership"])
 
     col1, col2 = st.columns(2)
 
@@ -270,56 +291,25 @@ try:
         st.table(df_10x)
 
         if revenue_growth > 0:
-            company_years = np.log(10) / np.log(1 + revenue_growth)
+            company_years = row["years_to_10x"]
             st.markdown(f"**At current revenue growth of {revenue_growth*100:.1f}%, this stock could 10x in {company_years:.1f} years.**")
 
     with col2:
         st.markdown("### Lynch Criteria for Ten Baggers")
 
-        score = 0
-        max_score = 4
-        checklist = []
-
-        if market_cap < 2e9:
-            score += 1
-            checklist.append("✅ Small market cap (< $2B)")
-        elif market_cap < 10e9:
-            score += 0.5
-            checklist.append("⚠️ Medium market cap ($2B–$10B)")
-        else:
-            checklist.append("❌ Large market cap (> $10B)")
-
-        if profit_margin > 0.15:
-            score += 1
-            checklist.append(f"✅ High profit margin ({profit_margin*100:.1f}%)")
-        elif profit_margin > 0.08:
-            score += 0.5
-            checklist.append(f"⚠️ Moderate profit margin ({profit_margin*100:.1f}%)")
-        else:
-            checklist.append(f"❌ Low profit margin ({profit_margin*100:.1f}%)")
-
-        if revenue_growth > 0.20:
-            score += 1
-            checklist.append(f"✅ Strong revenue growth ({revenue_growth*100:.1f}%)")
-        elif revenue_growth > 0.10:
-            score += 0.5
-            checklist.append(f"⚠️ Moderate revenue growth ({revenue_growth*100:.1f}%)")
-        else:
-            checklist.append(f"❌ Weak revenue growth ({revenue_growth*100:.1f}%)")
-
-        if inst_ownership < 0.3:
-            score += 1
-            checklist.append(f"✅ Low institutional ownership ({inst_ownership*100:.1f}%)")
-        elif inst_ownership < 0.6:
-            score += 0.5
-            checklist.append(f"⚠️ Moderate institutional ownership ({inst_ownership*100:.1f}%)")
-        else:
-            checklist.append(f"❌ High institutional ownership ({inst_ownership*100:.1f}%)")
-
-        for line in checklist:
-            st.markdown(line)
+        # Worst to best tier of each trait; the scores themselves come from the snapshot row
+        tier_text = {
+            "market_cap": ["Large market cap (> $10B)", "Medium market cap ($2B–$10B)", "Small market cap (< $2B)"],
+            "profit_margin": [f"{level} profit margin ({profit_margin*100:.1f}%)" for level in ["Low", "Moderate", "High"]],
+            "revenue_growth": [f"{level} revenue growth ({revenue_growth*100:.1f}%)" for level in ["Weak", "Moderate", "Strong"]],
+            "inst_ownership": [f"{level} institutional ownership ({inst_ownership*100:.1f}%)" for level in ["High", "Moderate", "Low"]],
+        }
+        icons = ["❌", "⚠️", "✅"]
+        for col, full, half, direction in TEN_BAGGER_TIERS:
+            tier = int(tier_points([row[col]], full, half, direction)[0] * 2)
+            st.markdown(f"{icons[tier]} {tier_text[col][tier]}")
 
-        potential = (score / max_score) * 100
+        potential = row["tenbagger_score"]
 
         gauge = go.Figure(go.Indicator(
             mode="gauge+number",
@@ -356,30 +346,30 @@ st.markdown("---")
 st.subheader("Lynch Custom Rule-Based Checklist")
 
 try:
-    # Rules 1–6 from get_stock_info()
-    peg_ratio = info.get("peg_ratio", None)
-    pe_ratio = info.get("pe_ratio", None)
-    debt_to_equity = info.get("de_ratio", None)
-    total_cash = info.get("cash", 0)
-    total_debt = info.get("debt", 0)
-    dividend_yield = info.get("div_yield", 0)
-    price_to_cashflow = info.get("price_to_cashflow", None)
-
-    # Rules 7–8 from yfinance
-    eps_growth = (yf_info.get('earningsGrowth') or 0) * 100
-    insider_ownership = (yf_info.get('heldPercentInsiders') or 0) * 100
+    # Values for the explanations come from the same row as the pass/fail
+    # flags (checklist_mask), so the two can't disagree
+    def row_value(col, default=None):
+        value = row.get(col)
+        return default if value is None or pd.isna(value) else value
+
+    peg_ratio = row_value("peg_ratio")
+    pe_ratio = row_value("pe_ratio")
+    debt_to_equity = row_value("de_ratio")
+    total_cash = row_value("cash", 0)
+    total_debt = row_value("debt", 0)
+    dividend_yield = row_value("div_yield", 0)
+    price_to_cashflow = row_value("price_to_cashflow")
+
+    eps_growth = np.nan_to_num(row["earnings_growth"]) * 100
+    insider_ownership = np.nan_to_num(row["insider_ownership"]) * 100
 
     pe_growth_ratio = (pe_ratio / eps_growth) if pe_ratio and eps_growth > 0 else None
 
     rules = [
         {
-            "rule": "PEG Ratio < 1",
-            "pass": isinstance(peg_ratio, (int, float)) and peg_ratio < 1,
-            "explanation": f"PEG Ratio is {peg_ratio:.2f}. Ideally < 1 means undervalued relative to growth." if peg_ratio is not None else "PEG Ratio not available."
+            "explanation": f"PEG Ratio is {peg_ratio:.2f}. Ideally < {PEG_MAX:g} means undervalued relative to growth." if peg_ratio is not None else "PEG Ratio not available."
         },
         {
-            "rule": "P/E Ratio < 20",
-            "pass": isinstance(pe_ratio, (int, float)) and pe_ratio < 20,
             "explanation": (
                 f"Lynch prefers companies where P/E is at or below the growth rate. "
                 f"Current P/E ({pe_ratio:.2f}) to growth ({eps_growth:.2f}%) ratio is {pe_growth_ratio:.2f}."
@@ -387,40 +377,32 @@ try:
             )
         },
         {
-            "rule": "Debt/Equity < 0.5",
-            "pass": isinstance(debt_to_equity, (int, float)) and debt_to_equity < 0.5,
             "explanation": f"Debt/Equity is {debt_to_equity:.2f}. Lynch liked companies with little debt." if debt_to_equity is not None else "Not available."
         },
         {
-            "rule": "Cash > Debt",
-            "pass": total_cash > total_debt,
-            "explanation": f"Company has ${total_cash:,} in cash vs ${total_debt:,} in debt. Strong financial position."
+            "explanation": f"Company has ${total_cash:,.0f} in cash vs ${total_debt:,.0f} in debt. Strong financial position."
         },
         {
-            "rule": "Dividend Yield > 2%",
-            "pass": isinstance(dividend_yield, (int, float)) and dividend_yield > 2,
             "explanation": f"Dividend Yield is {dividend_yield:.2f}%. Lynch favored income-generating stocks."
         },
         {
-            "rule": "Price to Cash Flow > 5",
-            "pass": isinstance(price_to_cashflow, (int, float)) and price_to_cashflow > 5,
             "explanation": f"Price/Cash Flow is {price_to_cashflow:.2f}. Higher values may indicate overvaluation." if price_to_cashflow is not None else "Not available."
         },
         {
-            "rule": "EPS Growth > 10%",
-            "pass": eps_growth > 10,
             "explanation": f"EPS Growth is {eps_growth:.2f}%. Lynch sought consistent double-digit growth."
         },
         {
-            "rule": "Insider Ownership > 5%",
-            "pass": insider_ownership > 5,
             "explanation": f"Insiders own {insider_ownership:.2f}%. Indicates skin in the game."
         }
     ]
 
-    passed = sum(1 for r in rules if r["pass"])
+    # Labels and pass/fail come from the same rules that built checklist_mask
+    for rule, (label, rule_passed) in zip(rules, checklist_results(row["checklist_mask"])):
+        rule["rule"] = label
+        rule["pass"] = rule_passed
+    passed = int(row["checklist_passed"])
     total = len(rules)
-    score = int((passed / total) * 100)
+    score = int(row["checklist_score"])
 
     col1, col2 = st.columns(2)
 
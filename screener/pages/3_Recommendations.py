@@ -1,19 +1,21 @@
 import streamlit as st
-from utils.data_loader import get_dow30_tickers, get_bulk_stock_data
-from utils.lynch_scoring import score_lynch_criteria
+from utils.data_loader import drop_failed, get_bulk_stock_data
+from utils.universes import select_universe, universe_label
+from utils.warmup import show_warmup_status
+from utils.lynch_scoring import score_lynch_frame
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.cluster import KMeans
-from numpy import unique, where
 
 
 st.title("✅ Top Buy & Sell Recommendations")
 
-tickers = get_dow30_tickers()
+universe = select_universe()
+show_warmup_status(universe["name"])
+tickers = universe["symbols"]
 df = get_bulk_stock_data(tickers)
-df["score"] = df.apply(lambda row: score_lynch_criteria(row)[0], axis=1)
+df = drop_failed(df)
+df["score"] = score_lynch_frame(df)["score"]
 
 st.subheader("📈 Top 10 Stocks to Buy")
 top_buy = df.sort_values("score", ascending=False).head(10)
@@ -29,62 +31,44 @@ st.dataframe(top_sell[[
     "div_yield", "price_to_cashflow", "score"
 ]])
 
+st.subheader("🚀 Top 10 Ten-Bagger Candidates")
+top_tenbagger = df.sort_values(["tenbagger_score", "checklist_score"], ascending=False).head(10)
+st.dataframe(top_tenbagger[[
+    "symbol", "market_cap", "profit_margin", "revenue_growth", "inst_ownership",
+    "years_to_10x", "tenbagger_score", "checklist_score"
+]])
+
 
 # ----------------- Clustering Insights -----------------
 st.markdown("---")
 st.subheader("📈 Clustering: Stocks to Long vs Sell (K-Means)")
 
 try:
-    from sklearn.preprocessing import MinMaxScaler
-    from sklearn.cluster import KMeans
-    import plotly.express as px
-    import numpy as np
-
-    # Drop non-numeric/informative columns before clustering
-    clustering_df = df.copy().set_index("symbol").fillna(0)
-
-    # Drop these columns before clustering
-    drop_cols = [
-        'maxAge', 'currentPrice', 'targetHighPrice', 'targetLowPrice',
-        'targetMeanPrice', 'targetMedianPrice', 'recommendationMean',
-        'recommendationKey', 'numberOfAnalystOpinions', 'financialCurrency'
-    ]
-    clustering_df = clustering_df.drop(columns=[col for col in drop_cols if col in clustering_df.columns], errors='ignore')
-
-    # Select only numeric columns for clustering
-    X = clustering_df.select_dtypes(include=[np.number])
-
-    # Scale features
-    scaler = MinMaxScaler()
-    X_scaled = scaler.fit_transform(X)
-
-    # Run KMeans
-    model = KMeans(n_clusters=4, random_state=100)
-    cluster_labels = model.fit_predict(X_scaled) 
-
-    # Add cluster assignments
-    clustering_df["cluster"] = cluster_labels
+    from utils.clustering import cluster_frame
 
-    # Compute cluster means and sort to identify best/worst clusters
-    cluster_mean_metric = clustering_df.groupby("cluster")[X.columns[2]].mean()
-    best_cluster = cluster_mean_metric.idxmax()
-    worst_cluster = cluster_mean_metric.idxmin()
+    # Fitted models are cached per snapshot and feature set, so widget reruns reuse them
+    clusters = cluster_frame(df)
+    features = clusters["features"]
+    clustering_df = pd.DataFrame({"cluster": clusters["labels"]}, index=df["symbol"].astype(str))
+    best_cluster = clusters["best"]
+    worst_cluster = clusters["worst"]
 
     # Assign colors and labels
     clustering_df["cluster_label"] = clustering_df["cluster"].apply(lambda x: f"Cluster {x+1}")
 
     # Plot using Plotly
     fig = px.scatter(
-        x=X_scaled[:, 0],
-        y=X_scaled[:, 1],
+        x=clusters["scaled"][:, 0],
+        y=clusters["scaled"][:, 1],
         color=clustering_df["cluster_label"],
         hover_name=clustering_df.index,
-        title="K-Means Clustering of Dow 30 Stocks",
-        labels={"x": f"{X.columns[0]} (Scaled)", "y": f"{X.columns[1]} (Scaled)"}
+        title=f"K-Means Clustering of {universe_label(universe['name'])} Stocks",
+        labels={"x": f"{features[0]} (Scaled)", "y": f"{features[1]} (Scaled)"}
     )
     fig.update_traces(marker=dict(size=10, line=dict(width=1, color='DarkSlateGrey')))
     fig.update_layout(height=600)
     st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Clusters ranked by mean Lynch score; features: {', '.join(features)}")
 
     # Recommendations
     long_candidates = clustering_df[clustering_df["cluster"] == best_cluster].index.tolist()
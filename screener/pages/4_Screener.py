@@ -1,8 +1,12 @@
 import streamlit as st
 st.set_page_config(page_title="🔍 Lynch Screener", layout="wide")
-from utils.data_loader import get_dow30_tickers, get_bulk_stock_data
+from utils.data_loader import drop_failed, get_bulk_stock_data
+from utils.universes import select_universe
+from utils.warmup import show_warmup_status
+from utils.screen_filters import SCREENER_FILTERS, filter_mask, frame_version
+from utils.sensitivity import TOP_N, threshold_sensitivity
 import pandas as pd
-import yfinance as yf
+from utils.ticker_bundle import get_ticker_bundle
 import pandas as pd
 from datetime import datetime
 
@@ -11,45 +15,24 @@ st.write("")
 st.title("🔍 Screener")
 
 # ----------------- Filter Row -----------------
-col1, col2, col3, col4, col5 = st.columns(5)
-
-with col1:
-    peg_filter = st.checkbox("PEG Ratio < 1")
-    pe_filter = st.checkbox("P/E Ratio < 20")
-
-with col2:
-    de_filter = st.checkbox("Debt/Equity < 0.5")
-    cash_filter = st.checkbox("Cash > Debt")
-
-with col3:
-    div_filter = st.checkbox("Dividend Yield > 2%")
-    pcf_filter = st.checkbox("Price to Cash Flow > 5")
-
-with col4:
-    gm_filter = st.checkbox("Gross Margin > 20%")
-    om_filter = st.checkbox("Operating Margin > 10%")
-
-with col5:
-    roe_filter = st.checkbox("ROE > 10%")
-    roa_filter = st.checkbox("ROA > 5%")
+# Two checkboxes per column, in SCREENER_FILTERS order
+filter_names = list(SCREENER_FILTERS)
+active_filters = []
+for col, names in zip(st.columns(5), [filter_names[i:i + 2] for i in range(0, len(filter_names), 2)]):
+    with col:
+        for name in names:
+            if st.checkbox(SCREENER_FILTERS[name]["label"], key=f"filter_{name}"):
+                active_filters.append(name)
 
 # ----------------- Load Data -----------------
-tickers = get_dow30_tickers()
+universe = select_universe()
+show_warmup_status(universe["name"])
+tickers = universe["symbols"]
 df = get_bulk_stock_data(tickers)
+df = drop_failed(df)
 
 # ----------------- Apply Filters -----------------
-def apply_filters(row):
-    if peg_filter and (row["peg_ratio"] is None or row["peg_ratio"] >= 1): return False
-    if pe_filter and (row["pe_ratio"] is None or row["pe_ratio"] >= 20): return False
-    if de_filter and (row["de_ratio"] is None or row["de_ratio"] >= 0.5): return False
-    if cash_filter and (row["cash"] is None or row["debt"] is None or row["cash"] <= row["debt"]): return False
-    if div_filter and (row["div_yield"] is None or row["div_yield"] * 100 <= 2): return False
-    if pcf_filter and (row["price_to_cashflow"] is None or row["price_to_cashflow"] <= 5): return False
-    return True
-
-filtered_df = df[df.apply(apply_filters, axis=1)] if any([
-    peg_filter, pe_filter, de_filter, cash_filter, div_filter, pcf_filter
-]) else df
+filtered_df = df[filter_mask(df, active_filters)] if active_filters else df
 
 
 st.markdown("### Results")
@@ -59,19 +42,17 @@ columns_to_show = [
     "div_yield", "price_to_cashflow", "gross_margin", "operating_margin", "roe", "roa"
 ]
 
-display_df = filtered_df[columns_to_show].copy()
-display_df.columns = [
+display_df = filtered_df[columns_to_show].rename(columns=dict(zip(columns_to_show, [
     "Name", "Symbol", "PEG Ratio", "P/E Ratio", "Debt/Equity", "Cash", "Debt",
     "Dividend Yield", "Price/Cash Flow", "Gross Margin", "Operating Margin", "ROE", "ROA"
-]
-
-# Round and format numeric columns
-for col in ["PEG Ratio", "P/E Ratio", "Debt/Equity", "Dividend Yield", "Price/Cash Flow",
-            "Gross Margin", "Operating Margin", "ROE", "ROA"]:
-    display_df[col] = display_df[col].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "N/A")
+])))
 
-for col in ["Cash", "Debt"]:
-    display_df[col] = display_df[col].apply(lambda x: f"${x:,.0f}" if pd.notna(x) else "N/A")
+# Round and format numeric columns; the Styler formats at render time instead
+# of keeping a string copy of every column
+formats = {col: "{:.2f}" for col in ["PEG Ratio", "P/E Ratio", "Debt/Equity", "Dividend Yield", "Price/Cash Flow",
+                                     "Gross Margin", "Operating Margin", "ROE", "ROA"]}
+formats.update({col: "${:,.0f}" for col in ["Cash", "Debt"]})
+display_df = display_df.style.format(formats, na_rep="N/A")
 
 # ----------------- Row Display Option -----------------
 row_option = st.selectbox("Select how many rows to show at once", [5, 10, 30], index=1)
@@ -82,6 +63,25 @@ table_height = row_option * row_height_px + 50
 
 st.dataframe(display_df, use_container_width=True, height=table_height)
 
+# ----------------- Threshold Sensitivity -----------------
+@st.cache_data(ttl=300, show_spinner=False)
+def get_sensitivity(version, _df):
+    # Keyed by frame version; the frame itself is not hashed
+    return threshold_sensitivity(_df)
+
+
+if st.toggle("Threshold sensitivity", help="Re-rank the universe under every combination of nearby Lynch cutoffs"):
+    sensitivity = get_sensitivity(frame_version(df), df)
+    stability = sensitivity["tickers"].sort_values(["rank_mean", "rank"]).head(row_option * 3)
+    st.caption(f"{len(sensitivity['combos']):,} cutoff combinations; the current top {TOP_N} keeps "
+               f"{sensitivity['combos']['top_overlap'].mean():.0%} of its members on average.")
+    st.dataframe(stability.rename(columns={
+        "score": "Score", "rank": "Rank", "score_mean": "Mean Score", "score_std": "Score Std",
+        "score_min": "Min Score", "score_max": "Max Score", "rank_mean": "Mean Rank", "rank_std": "Rank Std",
+        "rank_best": "Best Rank", "rank_worst": "Worst Rank", "top_share": f"Top {TOP_N} Share",
+    }).style.format({"Mean Score": "{:.2f}", "Score Std": "{:.2f}", "Mean Rank": "{:.1f}", "Rank Std": "{:.1f}",
+                     f"Top {TOP_N} Share": "{:.0%}"}), use_container_width=True)
+
 
 # ----------------- Display Table -----------------
 st.markdown("---")
@@ -108,16 +108,14 @@ st.markdown("""
 st.markdown("Compare up to four stocks by selecting symbols from the dropdown below:")
 
 # ---------------------- Dropdowns ----------------------
-dow30 = get_dow30_tickers()
 cols = st.columns(4)
-tickers = [cols[i].selectbox(f"Stock {i+1}", [""] + dow30, key=f"stock{i}") for i in range(4)]
+tickers = [cols[i].selectbox(f"Stock {i+1}", [""] + universe["symbols"], key=f"stock{i}") for i in range(4)]
 selected_tickers = [t for t in tickers if t]
 
 # ---------------------- Fetch & Organize Data ----------------------
 def get_stock_data(ticker):
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = get_ticker_bundle(ticker).info
         return {
             "Name": info.get("shortName", "N/A"),
             "Symbol": ticker,
@@ -5,15 +5,23 @@ import plotly.graph_objects as go
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.cluster import KMeans
 from numpy import unique, where
-from utils.data_loader import get_dow30_tickers, get_bulk_stock_data
-from utils.lynch_scoring import score_lynch_criteria
+from utils.data_loader import drop_failed, get_bulk_stock_data
+from utils.universes import select_universe, universe_label
+from utils.warmup import show_warmup_status
+from utils.lynch_scoring import score_lynch_frame
+from utils.correlation import metric_correlation, return_correlation, top_pairs
+
+MAX_HEATMAP_TICKERS = 60
 
 st.set_page_config(page_title="🧠 Market Insights", layout="wide")
-st.title("🧠 Market Insights (Dow 30)")
+universe = select_universe()
+show_warmup_status(universe["name"])
+st.title(f"🧠 Market Insights ({universe_label(universe['name'])})")
 
-tickers = get_dow30_tickers()
+tickers = universe["symbols"]
 df = get_bulk_stock_data(tickers)
-df["score"] = df.apply(lambda row: score_lynch_criteria(row)[0], axis=1)
+df = drop_failed(df)
+df["score"] = score_lynch_frame(df)["score"]
 
 # ----------------- Lynch Score Histogram -----------------
 st.markdown("### 📊 Lynch Score Distribution")
@@ -25,16 +33,38 @@ st.plotly_chart(fig1, use_container_width=True)
 st.markdown("---")
 st.markdown("### 📌 Financial Metric Correlations")
 
-metrics_df = df[[
+# Pairwise-complete: a ticker missing one metric still counts for the others
+metric_corr = metric_correlation(df, [
     "peg_ratio", "pe_ratio", "de_ratio", "cash", "debt", "div_yield",
     "price_to_cashflow", "roe", "roa"
-]].dropna()
+])
 
-fig2 = px.imshow(metrics_df.corr(), text_auto=True, aspect="auto",
-                 color_continuous_scale="RdBu_r", title="Correlation Heatmap")
+fig2 = px.imshow(metric_corr, text_auto=".2f", aspect="auto",
+                 color_continuous_scale="RdBu_r", zmin=-1, zmax=1, title="Correlation Heatmap")
 fig2.update_layout(height=500)
 st.plotly_chart(fig2, use_container_width=True)
 
+# ----------------- Return Correlations -----------------
+st.markdown("---")
+st.markdown("### 🔗 Daily Return Correlations (1y)")
+
+return_corr = return_correlation(df["symbol"].astype(str).tolist())
+return_corr = return_corr.dropna(how="all").dropna(axis=1, how="all")
+if return_corr.empty:
+    st.info("Price history for this universe is still being downloaded.")
+elif len(return_corr) <= MAX_HEATMAP_TICKERS:
+    fig3 = px.imshow(return_corr, aspect="auto", color_continuous_scale="RdBu_r", zmin=-1, zmax=1)
+    fig3.update_layout(height=600)
+    st.plotly_chart(fig3, use_container_width=True)
+else:
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Most correlated pairs")
+        st.dataframe(top_pairs(return_corr, 15), use_container_width=True, hide_index=True)
+    with col2:
+        st.markdown("#### Least correlated pairs")
+        st.dataframe(top_pairs(return_corr, 15, ascending=True), use_container_width=True, hide_index=True)
+
 # ----------------- Top 10 Lynch Scorers -----------------
 st.markdown("---")
 st.markdown("### 🏆 Top 10 Lynch Scorers")
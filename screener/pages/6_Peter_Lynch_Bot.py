@@ -79,8 +79,12 @@ from langchain.chat_models import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
 from langchain.schema.runnable import RunnablePassthrough
 from langchain_openai.embeddings import OpenAIEmbeddings
+from utils import shared_cache
 import os
 
+# Answers are shared by every worker process; the same question is only sent to the model once a week
+ANSWER_TTL = 7 * 86400
+
 # --- Load environment variables
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -129,7 +133,8 @@ def get_answer(question: str) -> str:
         | chat
         | StrOutputParser()
     )
-    return chain.invoke(question)
+    key = " ".join(question.lower().split())
+    return shared_cache.get_or_compute("rag", key, lambda: chain.invoke(question), ttl=ANSWER_TTL)
 
 # --- Chat input
 user_input = st.chat_input("Ask a question about Peter Lynch's philosophy...")
@@ -0,0 +1,103 @@
+"""Build the fundamentals snapshot workbook.
+
+Run from the screener directory, e.g. from cron:
+
+    python snapshot.py --output dowjones_lynch_project_data.xlsx
+
+With --incremental only stale or recently-reporting tickers are refetched
+and the tickers/fields that changed are printed; otherwise every row older
+than the disk cache's fresh TTL is refetched. Each run also appends a
+snapshot to the point-in-time archive (utils/snapshot_archive.py), dated
+by the newest fetch it contains.
+"""
+import argparse
+import os
+
+import pandas as pd
+
+from utils import disk_cache, snapshot_archive
+from utils.data_loader import FETCH_CHUNK_SIZE, fetch_bulk_stock_info, records_to_table, snapshot_version, table_to_frame
+from utils.refresh import refresh_incremental
+from utils.universes import DEFAULT_UNIVERSE, get_universe, list_universes
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dowjones_lynch_project_data.xlsx")
+
+
+def _cached_table(symbols, failed):
+    """The snapshot table built from the rows on disk, and when it was known.
+
+    The job has just brought every row up to date on disk, so reading them
+    back as is keeps get_bulk_stock_table's stale-while-revalidate out of
+    it. ``failed`` maps tickers whose refetch failed to their failed
+    record; they are reported as failed rather than served from an older
+    row. The time returned is the newest fetch among the rows, i.e. when
+    all of this data was available.
+    """
+    cached = disk_cache.read_latest(symbols)
+    records, fetched = [], []
+    for s in symbols:
+        if s in failed:
+            records.append(failed[s])
+        elif s in cached:
+            records.append(cached[s][0])
+            fetched.append(cached[s][1])
+        else:
+            records.append({"symbol": s, "status": "error", "error": "not in cache"})
+    table = records_to_table(records).replace_schema_metadata({"snapshot_version": snapshot_version(records)})
+    as_of = pd.to_datetime(max(fetched), unit="s") if fetched else pd.Timestamp.now("UTC").tz_localize(None)
+    return table, as_of
+
+
+def _refresh_all(symbols):
+    # Rows past the fresh TTL are fetched inline: a background revalidation
+    # would die with the job, leaving the archive with old rows
+    failed = {}
+    for start in range(0, len(symbols), FETCH_CHUNK_SIZE):
+        chunk = symbols[start:start + FETCH_CHUNK_SIZE]
+        records = disk_cache.get_many(chunk, fetch_bulk_stock_info, stale_ttl=disk_cache.FRESH_TTL)
+        failed.update((r["symbol"], r) for r in records if r.get("status", "ok") != "ok")
+    return failed
+
+
+def build_snapshot(output=DEFAULT_OUTPUT, universe=DEFAULT_UNIVERSE, incremental=False, archive=True):
+    symbols = list(get_universe(universe)["symbols"])
+    if incremental:
+        result = refresh_incremental(symbols)
+        failed = {s: {"symbol": s, "status": "error", "error": "fetch failed"} for s in result["failed"]}
+    else:
+        result = None
+        failed = _refresh_all(symbols)
+    table, as_of = _cached_table(symbols, failed)
+    df = table_to_frame(table)
+    df.to_excel(output, index=False)
+    archived = snapshot_archive.snapshot_dates(universe) if archive else []
+    # Nothing fetched since the last archived snapshot: it already holds this data
+    if archive and not (archived and as_of.floor("s") <= archived[-1]):
+        snapshot_archive.append(table, universe, as_of=as_of)
+    return df, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch fundamentals and write the snapshot workbook.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="path of the .xlsx file to write")
+    parser.add_argument("--universe", default=DEFAULT_UNIVERSE, choices=list_universes(),
+                        help="named ticker universe to fetch")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only refetch stale or recently-reporting tickers")
+    parser.add_argument("--no-archive", dest="archive", action="store_false",
+                        help="don't append this run to the snapshot archive")
+    args = parser.parse_args()
+
+    df, result = build_snapshot(args.output, args.universe, args.incremental, args.archive)
+    if result is not None:
+        print(f"Refetched {len(result['fetched'])} tickers, {len(result['changes'])} changed")
+        for symbol, fields in sorted(result["changes"].items()):
+            print(f"  {symbol}: {', '.join(fields)}")
+    print(f"Wrote {len(df)} rows to {args.output}")
+    failed = df[df["status"] != "ok"]
+    for row in failed.itertuples():
+        print(f"  failed {row.symbol}: {row.status} - {row.error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import pytest
+import requests
+
+from utils import fetch_scheduler
+from utils.fetch_scheduler import FetchScheduler, is_transient
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} Client Error", response=response)
+
+
+@pytest.mark.parametrize("status, transient", [(404, False), (400, False), (429, True), (503, True)])
+def test_http_errors_are_classified_by_status(status, transient):
+    assert is_transient(http_error(status)) is transient
+
+
+def test_client_errors_are_not_retried_or_counted_against_the_breaker(monkeypatch):
+    monkeypatch.setattr(fetch_scheduler, "backoff_delay", lambda attempt: 0)
+    scheduler = FetchScheduler(max_retries=2)
+
+    def fetch(key):
+        raise http_error(404 if key.startswith("DEAD") else 503)
+
+    dead = scheduler.run([f"DEAD{i}" for i in range(20)], fetch)
+    assert {o["status"] for o in dead} == {"error"}
+    assert {o["attempts"] for o in dead} == {1}
+    assert scheduler.breaker().state == "closed"
+
+    [flaky] = scheduler.run(["UP"], fetch)
+    assert flaky["attempts"] == 3
@@ -0,0 +1,35 @@
+import importlib
+import os
+import socket
+import sys
+
+import pandas as pd
+
+SCREENER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_data_loader_import_performs_no_io(tmp_path, monkeypatch):
+    calls = []
+
+    def refuse_connect(self, address):
+        calls.append(("connect", address))
+        raise OSError("network access during import")
+
+    def refuse_excel(self, *args, **kwargs):
+        calls.append(("to_excel", args))
+
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("LYNCH_CACHE_DIR", str(cache_dir))
+    monkeypatch.setattr(socket.socket, "connect", refuse_connect)
+    monkeypatch.setattr(pd.DataFrame, "to_excel", refuse_excel)
+    monkeypatch.syspath_prepend(SCREENER_DIR)
+    monkeypatch.chdir(tmp_path)
+    # Import fresh so module-level code runs under the patches
+    for name in [m for m in sys.modules if m == "utils" or m.startswith("utils.")]:
+        monkeypatch.delitem(sys.modules, name)
+
+    importlib.import_module("utils.data_loader")
+
+    assert calls == []
+    # Neither the cache directory nor anything in the working directory
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from utils.lynch_scoring import DE_MAX, DIV_YIELD_MIN, PCF_MIN, PE_MAX, PEG_MAX
+
+# Per-ticker analytics from the Stock Analysis page (ten-bagger potential and
+# the 8-rule Lynch checklist), computed for a whole fundamentals frame at
+# once so they can be stored in the snapshot, ranked and screened.
+
+# (column, full point, half point, direction). A value beyond the first
+# threshold scores 1, beyond the second 0.5, otherwise 0. Missing values
+# count as 0, as they always have on the page.
+TEN_BAGGER_TIERS = [
+    ("market_cap", 2e9, 10e9, "below"),
+    ("profit_margin", 0.15, 0.08, "above"),
+    ("revenue_growth", 0.20, 0.10, "above"),
+    ("inst_ownership", 0.3, 0.6, "below"),
+]
+
+# Each rule owns one bit of checklist_mask, in display order
+CHECKLIST_RULES = [
+    (f"PEG Ratio < {PEG_MAX:g}", lambda c: c["peg_ratio"] < PEG_MAX),
+    (f"P/E Ratio < {PE_MAX:g}", lambda c: c["pe_ratio"] < PE_MAX),
+    (f"Debt/Equity < {DE_MAX:g}", lambda c: c["de_ratio"] < DE_MAX),
+    ("Cash > Debt", lambda c: np.nan_to_num(c["cash"]) > np.nan_to_num(c["debt"])),
+    # The page's dividend yield is in percent, the scorer's cutoff a fraction
+    (f"Dividend Yield > {DIV_YIELD_MIN:.0%}", lambda c: c["div_yield"] > DIV_YIELD_MIN * 100),
+    (f"Price to Cash Flow > {PCF_MIN:g}", lambda c: c["price_to_cashflow"] > PCF_MIN),
+    ("EPS Growth > 10%", lambda c: np.nan_to_num(c["earnings_growth"]) * 100 > 10),
+    ("Insider Ownership > 5%", lambda c: np.nan_to_num(c["insider_ownership"]) * 100 > 5),
+]
+
+ANALYTICS_COLUMNS = ["years_to_10x", "tenbagger_score", "checklist_mask", "checklist_passed", "checklist_score"]
+
+_INPUT_COLUMNS = [
+    "peg_ratio", "pe_ratio", "de_ratio", "cash", "debt", "div_yield", "price_to_cashflow",
+    "earnings_growth", "insider_ownership", "market_cap", "profit_margin", "revenue_growth",
+    "inst_ownership",
+]
+
+
+def _columns(df):
+    return {
+        col: df[col].to_numpy(dtype="float64") if col in df.columns else np.full(len(df), np.nan)
+        for col in _INPUT_COLUMNS
+    }
+
+
+def tier_points(values, full, half, direction):
+    values = np.nan_to_num(np.asarray(values, dtype="float64"))
+    if direction == "below":
+        return np.where(values < full, 1.0, np.where(values < half, 0.5, 0.0))
+    return np.where(values > full, 1.0, np.where(values > half, 0.5, 0.0))
+
+
+def analytics_frame(df):
+    """Ten-bagger and checklist columns for every row of a fundamentals frame.
+
+    Returns a frame aligned with ``df``: ``years_to_10x`` at the current
+    revenue growth, ``tenbagger_score`` (0-100), the checklist bitmask
+    ``checklist_mask``, ``checklist_passed`` (0-8) and ``checklist_score``
+    (percent of rules passed).
+    """
+    columns = _columns(df)
+
+    points = sum(tier_points(columns[col], full, half, direction)
+                 for col, full, half, direction in TEN_BAGGER_TIERS)
+    tenbagger_score = points / len(TEN_BAGGER_TIERS) * 100
+
+    growth = np.nan_to_num(columns["revenue_growth"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        years_to_10x = np.where(growth > 0, np.log(10) / np.log1p(growth), np.nan)
+
+    mask = np.zeros(len(df), dtype=np.uint8)
+    with np.errstate(invalid="ignore", over="ignore"):
+        for bit, (_, rule) in enumerate(CHECKLIST_RULES):
+            mask |= np.asarray(rule(columns), dtype=np.uint8) << bit
+    passed = np.unpackbits(mask[:, None], axis=1).sum(axis=1).astype(np.int64)
+
+    return pd.DataFrame({
+        "years_to_10x": years_to_10x,
+        "tenbagger_score": tenbagger_score,
+        "checklist_mask": mask,
+        "checklist_passed": passed,
+        "checklist_score": passed * 100 // len(CHECKLIST_RULES),
+    }, index=df.index)
+
+
+def checklist_results(mask):
+    """(label, passed) for every checklist rule, decoded from one row's mask."""
+    mask = int(mask)
+    return [(label, bool(mask >> bit & 1)) for bit, (label, _) in enumerate(CHECKLIST_RULES)]
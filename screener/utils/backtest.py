@@ -0,0 +1,227 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.lynch_scoring import score_lynch_frame
+from utils.price_store import close_matrix
+
+# Offline backtests of Lynch-score portfolios: at every rebalance the top-N
+# (long) and bottom-N (short) tickers by the latest snapshot's score are
+# held equal-weighted until the next one. Everything is computed for all
+# days at once with array ops; parameter sweeps fan out over processes.
+TRADING_DAYS = 252
+REBALANCE_EVERY = 21            # trading days between rebalances
+TOP_N = 10
+SWEEP_WORKERS = int(os.environ.get("LYNCH_BACKTEST_WORKERS", os.cpu_count() or 1))
+
+_sweep_data = None
+
+
+def score_panel(snapshots):
+    """Snapshot dates x tickers frame of Lynch scores from (as_of, fundamentals frame) pairs,
+    such as snapshot_archive.iter_snapshots() yields."""
+    rows = {}
+    for as_of, frame in snapshots:
+        rows[pd.Timestamp(as_of)] = pd.Series(
+            score_lynch_frame(frame)["score"].to_numpy(dtype="float64"),
+            index=frame["symbol"].astype(str).to_numpy(),
+        )
+    return pd.DataFrame(rows).T.sort_index()
+
+
+def load_prices(tickers, period="max"):
+    """Dates x tickers closes from the local price store; never touches the network."""
+    return close_matrix(list(tickers), period)
+
+
+def _point_in_time(scores, prices):
+    # Scores as known on each price date: the latest snapshot taken on or before it
+    scores = scores.reindex(columns=prices.columns)
+    rows = np.searchsorted(scores.index.to_numpy(), prices.index.to_numpy(), side="right") - 1
+    known = np.full(prices.shape, np.nan)
+    has_snapshot = rows >= 0
+    known[has_snapshot] = scores.to_numpy(dtype="float64")[rows[has_snapshot]]
+    return known
+
+
+def _select(scores, n, long):
+    # Equal weights on the n best (or worst) eligible scores per row; ties go
+    # to column order. NaN means not eligible.
+    key = np.where(np.isnan(scores), -np.inf, scores if long else -scores)
+    order = np.argsort(-key, axis=1, kind="stable")[:, :n]
+    picked = np.take_along_axis(key, order, axis=1) > -np.inf
+    weights = np.zeros(scores.shape)
+    np.put_along_axis(weights, order, picked.astype("float64"), axis=1)
+    counts = weights.sum(axis=1, keepdims=True)
+    return np.divide(weights, counts, out=np.zeros_like(weights), where=counts > 0)
+
+
+def _leg(weights, growth, starts, period_of_day, cost):
+    """Daily returns and per-rebalance turnover of a leg rebalanced to ``weights`` at ``starts``."""
+    # Holdings bought at the close of starts[p] are marked against that close
+    # on every day of period p; before the first rebalance nothing is held
+    held = period_of_day >= 0
+    period = np.where(held, period_of_day, 0)
+    value = (weights[period] * growth / growth[starts[period]]).sum(axis=1)
+    previous = np.r_[1.0, value[:-1]]
+    previous[period_of_day != np.r_[-1, period_of_day[:-1]]] = 1.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.where(held & (previous > 0), value / previous - 1, 0.0)
+
+    # Turnover: trade from the drifted holdings to the new weights
+    drifted = weights[:-1] * growth[starts[1:]] / growth[starts[:-1]]
+    totals = drifted.sum(axis=1, keepdims=True)
+    drifted = np.divide(drifted, totals, out=np.zeros_like(drifted), where=totals > 0)
+    before = np.vstack([np.zeros((1, weights.shape[1])), drifted])
+    turnover = 0.5 * np.abs(weights - before).sum(axis=1)
+    if cost:
+        # Both sides of every trade pay, on the first day the new holdings count
+        first_days = starts + 1
+        inside = first_days < len(returns)
+        returns[first_days[inside]] -= 2 * turnover[inside] * cost
+    return returns, turnover
+
+
+def _stats(returns):
+    equity = np.cumprod(1 + returns)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    years = len(returns) / TRADING_DAYS
+    volatility = returns.std() * np.sqrt(TRADING_DAYS)
+    total = equity[-1] - 1 if len(equity) else 0.0
+    return {
+        "total_return": total,
+        "cagr": (1 + total) ** (1 / years) - 1 if years and total > -1 else np.nan,
+        "volatility": volatility,
+        "sharpe": returns.mean() * TRADING_DAYS / volatility if volatility else np.nan,
+        "max_drawdown": drawdown.min() if len(drawdown) else 0.0,
+    }
+
+
+def run_backtest(scores, prices, every=REBALANCE_EVERY, n=TOP_N, long_min=None, short_max=None,
+                 cost_bps=0.0):
+    """Simulate top-N long / bottom-N short Lynch-score portfolios.
+
+    ``scores`` is a snapshot-date x ticker frame (see score_panel) and
+    ``prices`` a date x ticker frame of closes (see load_prices). Every
+    ``every`` trading days the long leg buys the ``n`` highest scores of at
+    least ``long_min`` and the short leg the ``n`` lowest of at most
+    ``short_max``, using only snapshots taken on or before that day and
+    tickers with a price that day. ``cost_bps`` is charged per unit traded.
+
+    Returns a dict with daily ``returns`` (long, short, spread and the
+    equal-weight universe), ``equity``, ``drawdown``, per-rebalance
+    ``turnover`` and summary ``stats``.
+    """
+    close = prices.to_numpy(dtype="float64")
+    known = _point_in_time(scores, prices)
+    tradable = ~np.isnan(close)
+
+    # Growth of 1 since the first day; a missing price holds the last known one
+    filled = pd.DataFrame(close).ffill().bfill().to_numpy()
+    growth = np.nan_to_num(filled / filled[:1], nan=1.0)
+
+    first = int(np.argmax(~np.isnan(known).all(axis=1))) if (~np.isnan(known)).any() else len(close)
+    starts = np.arange(first, len(close), every)
+    if not len(starts):
+        raise ValueError("No snapshot precedes the price history")
+    # A rebalance day still belongs to the period that ends on it
+    period_of_day = np.searchsorted(starts, np.arange(len(close)), side="left") - 1
+
+    eligible = np.where(tradable[starts], known[starts], np.nan)
+    long_scores = eligible if long_min is None else np.where(eligible >= long_min, eligible, np.nan)
+    short_scores = eligible if short_max is None else np.where(eligible <= short_max, eligible, np.nan)
+    universe = np.where(np.isnan(eligible), 0.0, 1.0)
+    universe /= np.maximum(universe.sum(axis=1, keepdims=True), 1)
+
+    cost = cost_bps / 1e4
+    long_returns, long_turnover = _leg(_select(long_scores, n, True), growth, starts, period_of_day, cost)
+    short_returns, short_turnover = _leg(_select(short_scores, n, False), growth, starts, period_of_day, cost)
+    universe_returns, _ = _leg(universe, growth, starts, period_of_day, 0.0)
+
+    returns = pd.DataFrame({
+        "long": long_returns, "short": short_returns,
+        "spread": long_returns - short_returns, "universe": universe_returns,
+    }, index=prices.index).iloc[first:]
+    equity = (1 + returns).cumprod()
+    stats = pd.DataFrame({col: _stats(returns[col].to_numpy()) for col in returns.columns}).T
+    stats.loc["long", "turnover"] = long_turnover[1:].mean() if len(starts) > 1 else np.nan
+    stats.loc["short", "turnover"] = short_turnover[1:].mean() if len(starts) > 1 else np.nan
+    return {
+        "returns": returns,
+        "equity": equity,
+        "drawdown": equity / equity.cummax() - 1,
+        "turnover": pd.DataFrame({"long": long_turnover, "short": short_turnover}, index=prices.index[starts]),
+        "stats": stats,
+    }
+
+
+def _init_sweep(scores, prices):
+    global _sweep_data
+    _sweep_data = (scores, prices)
+
+
+def _run_params(params):
+    scores, prices = _sweep_data
+    stats = run_backtest(scores, prices, **params)["stats"]
+    row = dict(params)
+    for leg in ("long", "spread"):
+        for name, value in stats.loc[leg].items():
+            if not pd.isna(value):
+                row[f"{leg}_{name}"] = value
+    return row
+
+
+def sweep(scores, prices, grid, workers=SWEEP_WORKERS, cost_bps=0.0):
+    """Backtest every combination in ``grid`` ({parameter: [values]}), one row each.
+
+    Combinations run in a process pool; each worker receives the scores
+    and prices once when it starts rather than with every task.
+    """
+    names = list(grid)
+    combos = [dict(zip(names, values), cost_bps=cost_bps) for values in itertools.product(*grid.values())]
+    if workers <= 1 or len(combos) == 1:
+        _init_sweep(scores, prices)
+        rows = [_run_params(params) for params in combos]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(combos)), initializer=_init_sweep,
+                                 initargs=(scores, prices)) as pool:
+            rows = list(pool.map(_run_params, combos, chunksize=max(1, len(combos) // (4 * workers))))
+    return pd.DataFrame(rows)
+
+
+def _benchmark(n_tickers=3000, n_days=1260, snapshot_every=5):
+    import time
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2020-01-01", periods=n_days)
+    tickers = [f"T{i}" for i in range(n_tickers)]
+    quality = rng.integers(0, 7, n_tickers)
+    drift = 0.0002 * (quality - 3)
+    returns = drift + rng.normal(0, 0.02, (n_days, n_tickers))
+    prices = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=dates, columns=tickers)
+    prices[prices.sample(frac=0.02, axis=1, random_state=0).columns] = np.nan
+
+    snap_dates = dates[::snapshot_every]
+    noise = rng.integers(-1, 2, (len(snap_dates), n_tickers))
+    scores = pd.DataFrame(np.clip(quality + noise, 0, 6), index=snap_dates, columns=tickers, dtype="float64")
+
+    start = time.perf_counter()
+    result = run_backtest(scores, prices)
+    single = time.perf_counter() - start
+    print(f"{n_tickers} tickers x {n_days} days, {len(snap_dates)} snapshots")
+    print(f"  one backtest     {single * 1e3:8.0f} ms")
+    print(result["stats"].round(3).to_string())
+
+    grid = {"every": [5, 21, 63], "n": [10, 50, 200], "long_min": [None, 4, 5]}
+    for workers in (1, SWEEP_WORKERS):
+        start = time.perf_counter()
+        table = sweep(scores, prices, grid, workers=workers)
+        print(f"  sweep of {len(table)} on {workers} worker(s) {time.perf_counter() - start:8.2f} s")
+    print(table.sort_values("spread_sharpe", ascending=False).head().round(3).to_string())
+
+
+if __name__ == "__main__":
+    _benchmark()
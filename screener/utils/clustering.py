@@ -0,0 +1,193 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+# K-Means clustering for the Recommendations page, cached by data snapshot and
+# feature set. A rerun on the same snapshot reuses the fitted model; a new
+# snapshot where only a few rows moved updates the previous centroids as
+# running means (each cluster keeps its member count, so a moved row shifts
+# its centroid by 1/count), and tickers that are merely new are assigned to
+# their nearest centroid. Only a large change pays for a full fit.
+CLUSTER_FEATURES = (
+    "peg_ratio", "pe_ratio", "de_ratio", "div_yield", "price_to_cashflow",
+    "gross_margin", "operating_margin", "roe", "roa",
+)
+RANK_METRIC = "score"            # best/worst cluster = highest/lowest mean Lynch score
+N_CLUSTERS = 4
+RANDOM_STATE = 100
+MINIBATCH_ROWS = 1000            # above this, full fits use MiniBatchKMeans too
+PARTIAL_REFIT_SHARE = 0.10       # refit from the old centroids if at most this share of rows changed
+MAX_MODELS = 8
+
+_lock = threading.Lock()
+_models = OrderedDict()          # (snapshot, features, k) -> model
+_latest = {}                     # (features, k) -> last model, the base for incremental refits
+
+
+def _snapshot_key(df, features):
+    # The rows are part of the key: a filtered frame of the same snapshot is another dataset
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df["symbol"].astype(str), index=False).to_numpy().tobytes())
+    version = df.attrs.get("snapshot_version")
+    if version is None:
+        # No published version: hash exactly what the model sees
+        digest.update(pd.util.hash_pandas_object(df[list(features)], index=False).to_numpy().tobytes())
+        version = "unversioned"
+    return f"{version}:{digest.hexdigest()[:16]}"
+
+
+def _feature_matrix(df, features):
+    return np.nan_to_num(np.column_stack([df[col].to_numpy(dtype="float64") for col in features]))
+
+
+def _fit_scaler(X):
+    mins = X.min(axis=0)
+    scales = X.max(axis=0) - mins
+    scales[scales == 0] = 1.0
+    return mins, scales
+
+
+def _full_fit(X, n_clusters):
+    model_cls = MiniBatchKMeans if len(X) > MINIBATCH_ROWS else KMeans
+    return model_cls(n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=10).fit(X)
+
+
+def _nearest(scaled, centroids):
+    distances = ((scaled[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
+
+
+def _update_centroids(previous, leaving, arriving, n_clusters):
+    """Move the previous centroids as running means of their members.
+
+    ``leaving`` are indices into the previous model's rows whose old values
+    are taken out of their cluster; ``arriving`` are the new scaled rows,
+    added to the cluster nearest to them.
+    """
+    counts = np.bincount(previous["labels"], minlength=n_clusters).astype("float64")
+    sums = previous["centroids"] * counts[:, None]
+    np.subtract.at(sums, previous["labels"][leaving], previous["scaled"][leaving])
+    np.subtract.at(counts, previous["labels"][leaving], 1)
+    targets = _nearest(arriving, previous["centroids"])
+    np.add.at(sums, targets, arriving)
+    np.add.at(counts, targets, 1)
+    centroids = previous["centroids"].copy()
+    filled = counts > 0
+    centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+def _fit(df, features, n_clusters):
+    symbols = df["symbol"].astype(str).to_numpy()
+    X = _feature_matrix(df, features)
+    previous = _latest.get((features, n_clusters))
+
+    method = "full"
+    if previous is not None and len(X) >= n_clusters:
+        old_index = {s: i for i, s in enumerate(previous["symbols"])}
+        old_pos = np.array([old_index.get(s, -1) for s in symbols])
+        known = old_pos >= 0
+        changed = known.copy()
+        if known.any():
+            changed[known] = (previous["X"][old_pos[known]] != X[known]).any(axis=1)
+        moved = changed.sum() + (~known).sum()
+        if moved <= PARTIAL_REFIT_SHARE * len(X):
+            # Keep the old scaling so the old centroids still mean the same thing
+            mins, scales = previous["mins"], previous["scales"]
+            scaled = (X - mins) / scales
+            centroids = previous["centroids"]
+            if changed.sum() >= n_clusters:
+                centroids = _update_centroids(previous, old_pos[changed], scaled[changed], n_clusters)
+                method = "partial"
+            else:
+                # Too few moved rows to be worth a centroid update
+                method = "assigned"
+            labels = _nearest(scaled, centroids)
+
+    if method == "full":
+        mins, scales = _fit_scaler(X)
+        scaled = (X - mins) / scales
+        model = _full_fit(scaled, n_clusters)
+        centroids, labels = model.cluster_centers_, model.labels_
+
+    return {
+        "symbols": symbols, "X": X, "scaled": scaled, "labels": labels,
+        "centroids": centroids, "mins": mins, "scales": scales, "method": method,
+    }
+
+
+def cluster_frame(df, features=CLUSTER_FEATURES, n_clusters=N_CLUSTERS, rank_metric=RANK_METRIC):
+    """Cluster the rows of ``df`` and rank the clusters by ``rank_metric``.
+
+    Returns a dict with per-row ``labels`` and ``scaled`` features (aligned
+    with ``df``), the ``features`` used, cluster ``means`` of the metric, the
+    ``best`` and ``worst`` cluster and ``method``: cached, assigned, partial
+    or full.
+    """
+    features = tuple(features)
+    key = (_snapshot_key(df, features), features, n_clusters)
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            _models.move_to_end(key)
+            method = "cached"
+        else:
+            model = _fit(df, features, n_clusters)
+            method = model["method"]
+            _models[key] = model
+            _latest[(features, n_clusters)] = model
+            while len(_models) > MAX_MODELS:
+                _models.popitem(last=False)
+
+    means = pd.Series(df[rank_metric].to_numpy(dtype="float64")).groupby(model["labels"]).mean()
+    return {
+        "labels": model["labels"],
+        "scaled": model["scaled"],
+        "features": features,
+        "means": means,
+        "best": int(means.idxmax()),
+        "worst": int(means.idxmin()),
+        "method": method,
+    }
+
+
+def _benchmark(n=3000, changed=0.02):
+    import time
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({col: rng.lognormal(0, 1, n) for col in CLUSTER_FEATURES})
+    df.insert(0, "symbol", [f"T{i}" for i in range(n)])
+    df["score"] = rng.integers(0, 7, n)
+    df.attrs["snapshot_version"] = "v1"
+
+    def timed(frame):
+        start = time.perf_counter()
+        result = cluster_frame(frame)
+        return (time.perf_counter() - start) * 1e3, result["method"]
+
+    print(f"{n} tickers")
+    print("  first fit      %8.1f ms (%s)" % timed(df))
+    print("  rerun          %8.1f ms (%s)" % timed(df))
+
+    moved = df.copy()
+    rows = rng.choice(n, int(n * changed), replace=False)
+    moved.loc[rows, "pe_ratio"] *= 1.1
+    moved.attrs["snapshot_version"] = "v2"
+    print("  %d rows moved %8.1f ms (%s)" % ((len(rows),) + timed(moved)))
+
+    grown = pd.concat([moved, df.iloc[:50].assign(symbol=[f"NEW{i}" for i in range(50)])], ignore_index=True)
+    grown.attrs["snapshot_version"] = "v3"
+    print("  50 new tickers %8.1f ms (%s)" % timed(grown))
+
+    with _lock:
+        _latest.clear()
+    shuffled = grown.copy()
+    shuffled.attrs["snapshot_version"] = "v4"
+    print("  full refit     %8.1f ms (%s)" % timed(shuffled))
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.price_store import close_matrix, load_bars
+
+# Pairwise-complete Pearson correlations, like DataFrame.corr() but computed
+# from NaN masks with matrix products, block by block, so a ticker missing
+# one metric only drops out of the pairs that involve that metric, and a
+# 3000x3000 return matrix never needs more than MEMORY_BUDGET of scratch
+# space on top of the result.
+MEMORY_BUDGET = int(os.environ.get("LYNCH_CORR_MEMORY_MB", 64)) * 2**20
+MIN_RETURN_PERIODS = 20         # fewer shared days than this gives NaN
+MAX_RESULTS = 4
+
+_lock = threading.Lock()
+_results = OrderedDict()
+
+
+def _block_size(n_obs, n_vars, budget):
+    # Per block pair: Z, Z², M slices for both sides (n_obs x b) and about
+    # eight b x b temporaries, all float64
+    size = n_vars
+    while size > 16 and 8 * (6 * n_obs * size + 8 * size * size) > budget:
+        size //= 2
+    return max(1, size)
+
+
+def pairwise_corr(values, min_periods=1, budget=MEMORY_BUDGET):
+    """Correlation matrix (float32) of the columns of ``values`` over their shared rows.
+
+    ``values`` is an observations x variables array with NaN for missing
+    data; pairs with fewer than ``min_periods`` shared rows, or with no
+    variance over them, come out as NaN.
+    """
+    X = np.asarray(values, dtype="float64")
+    n_obs, n_vars = X.shape
+    valid = ~np.isnan(X)
+    # Centering changes nothing mathematically but keeps the one-pass sums accurate
+    Z = np.where(valid, X, 0.0)
+    center = Z.sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    Z = np.where(valid, Z - center, 0.0)
+    M = valid.astype("float64")
+    del X
+
+    out = np.empty((n_vars, n_vars), dtype="float32")
+    size = _block_size(n_obs, n_vars, budget)
+    for a in range(0, n_vars, size):
+        Za, Ma = Z[:, a:a + size], M[:, a:a + size]
+        Za2 = Za * Za
+        for b in range(a, n_vars, size):
+            Zb, Mb = Z[:, b:b + size], M[:, b:b + size]
+            n = Ma.T @ Mb
+            sum_a = Za.T @ Mb           # sum of column a over the rows shared with b
+            sum_b = Ma.T @ Zb
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cov = Za.T @ Zb - sum_a * sum_b / n
+                var_a = Za2.T @ Mb - sum_a * sum_a / n
+                var_b = Ma.T @ (Zb * Zb) - sum_b * sum_b / n
+                corr = cov / np.sqrt(var_a * var_b)
+            corr[(n < max(min_periods, 2)) | (var_a <= 0) | (var_b <= 0)] = np.nan
+            np.clip(corr, -1.0, 1.0, out=corr)
+            out[a:a + size, b:b + size] = corr
+            out[b:b + size, a:a + size] = corr.T
+    return out
+
+
+def _cached(key, compute):
+    with _lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+    result = compute()
+    with _lock:
+        _results[key] = result
+        while len(_results) > MAX_RESULTS:
+            _results.popitem(last=False)
+    return result
+
+
+def metric_correlation(df, columns, min_periods=3):
+    """Metric-by-metric correlation of a fundamentals frame, cached per snapshot version."""
+    columns = list(columns)
+    version = df.attrs.get("snapshot_version")
+    if version is None:
+        version = hashlib.sha1(pd.util.hash_pandas_object(df[columns]).to_numpy().tobytes()).hexdigest()
+    key = ("metrics", version, len(df), tuple(columns), min_periods)
+    return _cached(key, lambda: pd.DataFrame(
+        pairwise_corr(df[columns].to_numpy(dtype="float64"), min_periods), index=columns, columns=columns
+    ))
+
+
+def _daily_returns(tickers, period):
+    """Dates x tickers matrix of daily close-to-close returns from the stored bars."""
+    closes = close_matrix(tickers, period).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = closes[1:] / closes[:-1] - 1
+    return np.where(np.isfinite(returns), returns, np.nan)
+
+
+def _bars_version(tickers):
+    # The newest stored bar per ticker identifies the price data well enough
+    digest = hashlib.sha1()
+    for ticker in tickers:
+        bars, _ = load_bars(ticker, "1d")
+        digest.update(f"{ticker}:{len(bars)}:{bars['ts'][-1] if len(bars) else 0};".encode())
+    return digest.hexdigest()
+
+
+def return_correlation(tickers, period="1y", min_periods=MIN_RETURN_PERIODS):
+    """Ticker-by-ticker correlation of daily returns, from bars already on disk.
+
+    Only reads the local price store (the warmer keeps 1d/1y bars for every
+    member); tickers without stored bars come out as NaN rows.
+    """
+    tickers = list(tickers)
+    key = ("returns", _bars_version(tickers), period, min_periods)
+    return _cached(key, lambda: pd.DataFrame(
+        pairwise_corr(_daily_returns(tickers, period), min_periods), index=tickers, columns=tickers
+    ))
+
+
+def top_pairs(corr, n=10, ascending=False):
+    """The ``n`` most (or least) correlated distinct pairs of a correlation frame."""
+    values = corr.to_numpy()
+    i, j = np.triu_indices(len(values), k=1)
+    upper = values[i, j].astype("float64")
+    keep = ~np.isnan(upper)
+    i, j, upper = i[keep], j[keep], upper[keep]
+    order = np.argsort(upper if ascending else -upper, kind="stable")[:n]
+    labels = corr.index.to_numpy()
+    return pd.DataFrame({"a": labels[i[order]], "b": labels[j[order]], "correlation": upper[order]})
+
+
+def _benchmark(n_tickers=3000, n_days=252, missing=0.05):
+    import time
+    import tracemalloc
+
+    rng = np.random.default_rng(0)
+    market = rng.normal(0, 0.01, (n_days, 1))
+    returns = market + rng.normal(0, 0.015, (n_days, n_tickers))
+    returns[rng.random(returns.shape) < missing] = np.nan
+    frame = pd.DataFrame(returns)
+
+    start = time.perf_counter()
+    expected = frame.corr(min_periods=MIN_RETURN_PERIODS).to_numpy()
+    pandas_ms = (time.perf_counter() - start) * 1e3
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = pairwise_corr(returns, MIN_RETURN_PERIODS)
+    blocked_ms = (time.perf_counter() - start) * 1e3
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"{n_tickers}x{n_tickers} returns over {n_days} days, {missing:.0%} missing")
+    print(f"  DataFrame.corr   {pandas_ms:8.0f} ms")
+    print(f"  pairwise_corr    {blocked_ms:8.0f} ms, peak {peak / 2**20:.0f} MB "
+          f"(result {result.nbytes / 2**20:.0f} MB, budget {MEMORY_BUDGET / 2**20:.0f} MB)")
+    print(f"  max abs diff     {np.nanmax(np.abs(result - expected)):.2e}")
+
+
+if __name__ == "__main__":
+    _benchmark()
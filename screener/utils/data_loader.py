@@ -1,7 +1,62 @@
+import hashlib
+import json
+import logging
+import time
+
+import numpy as np
 import pandas as pd
-import yfinance as yf
+import pyarrow as pa
 import streamlit as st
 
+from utils import disk_cache, snapshot_store
+from utils.analytics import ANALYTICS_COLUMNS, analytics_frame
+from utils.fetch_scheduler import get_scheduler, is_rate_limited
+from utils.market_data import get_provider
+
+# Column order of the fundamentals frame returned by get_bulk_stock_data
+FUNDAMENTAL_COLUMNS = [
+    "symbol", "name", "current_price", "target_high_price", "target_low_price",
+    "pe_ratio", "peg_ratio", "de_ratio", "cash", "debt", "div_yield",
+    "free_cash_flow", "shares_outstanding", "price_to_cashflow", "roe", "roa",
+    "gross_margin", "operating_margin", "market_cap", "revenue_growth",
+    "profit_margin", "earnings_growth", "inst_ownership", "insider_ownership"
+]
+
+# Per-ticker timeout for bulk fetches; concurrency and rate limits live in
+# utils/fetch_scheduler.py
+DEFAULT_TICKER_TIMEOUT = 20
+
+# Budgets for large universes (Russell 3000 and up). Fetching goes chunk by
+# chunk so finished chunks land in the disk cache even if a later one stalls.
+FETCH_CHUNK_SIZE = 250
+CHUNK_LATENCY_BUDGET = 60           # seconds per cold chunk
+MEMORY_BUDGET_PER_TICKER = 2048     # bytes of frame memory per ticker
+
+TEXT_COLUMNS = {"symbol", "name", "status", "error"}
+
+# Fixed Arrow schema of the fundamentals table. Labels are dictionary
+# encoded (pandas categoricals); missing numbers are NaN, not nulls, so the
+# float columns reach pandas and NumPy without a copy. Display-only prices
+# and scores are float32; anything compared against a screening threshold
+# stays float64 so values sitting exactly on a threshold don't flip.
+_LABEL = pa.dictionary(pa.int32(), pa.string())
+_FLOAT32_COLUMNS = {"current_price", "target_high_price", "target_low_price"}
+FUNDAMENTAL_SCHEMA = pa.schema(
+    [pa.field(col, _LABEL if col in TEXT_COLUMNS else pa.float32() if col in _FLOAT32_COLUMNS else pa.float64())
+     for col in FUNDAMENTAL_COLUMNS]
+    + [
+        pa.field("status", _LABEL),
+        pa.field("error", pa.string()),
+        pa.field("years_to_10x", pa.float32()),
+        pa.field("tenbagger_score", pa.float32()),
+        pa.field("checklist_mask", pa.uint8()),
+        pa.field("checklist_passed", pa.uint8()),
+        pa.field("checklist_score", pa.uint8()),
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
 @st.cache_data(ttl=86400)
 def get_dow30_tickers():
     return [
@@ -10,11 +65,17 @@ def get_dow30_tickers():
         "MRK", "MSFT", "NKE", "PG", "TRV", "UNH", "V", "VZ", "WBA", "WMT"
     ]
 
-@st.cache_data(ttl=3600)
-def get_stock_info(ticker):
-    stock = yf.Ticker(ticker)
-    info = stock.info
+def _fetch_stock_info(ticker):
+    provider = get_provider()
+    return derive_fundamentals(ticker, provider.info(ticker), lambda: provider.income_stmt(ticker))
 
+
+def derive_fundamentals(ticker, info, income_stmt):
+    """Build the fundamentals record from an ``.info`` dict.
+
+    ``income_stmt`` is a zero-argument callable, only called when the PEG
+    has to be estimated from reported earnings.
+    """
     current_price = info.get("currentPrice")
     pe_ratio = info.get("trailingPE")
 
@@ -63,11 +124,11 @@ def get_stock_info(ticker):
     # PEG fallback 1: EPS CAGR via income_stmt
     if (peg_ratio is None or peg_ratio == 0):
         try:
-            income_stmt = stock.income_stmt
-            if "Net Income" in income_stmt.index and len(income_stmt.columns) >= 2 and shares_outstanding:
-                net_income_latest = income_stmt.loc["Net Income"].iloc[0]
-                net_income_base = income_stmt.loc["Net Income"].iloc[-1]
-                n_years = len(income_stmt.columns) - 1
+            statement = income_stmt()
+            if "Net Income" in statement.index and len(statement.columns) >= 2 and shares_outstanding:
+                net_income_latest = statement.loc["Net Income"].iloc[0]
+                net_income_base = statement.loc["Net Income"].iloc[-1]
+                n_years = len(statement.columns) - 1
 
                 if net_income_latest > 0 and net_income_base > 0:
                     eps_latest = net_income_latest / shares_outstanding
@@ -75,16 +136,28 @@ def get_stock_info(ticker):
                     eps_cagr = ((eps_latest / eps_base) ** (1 / n_years)) - 1
                     if eps_cagr > 0.01 and pe_ratio:
                         peg_ratio = round(pe_ratio / (eps_cagr * 100 if eps_cagr < 1 else eps_cagr), 2)
-        except:
-            pass 
+        except Exception as exc:
+            # Throttling must reach the scheduler so the ticker is retried;
+            # anything else just means the statement is missing or malformed
+            if is_rate_limited(exc):
+                raise
+            logger.debug("income_stmt PEG fallback failed for %s: %s", ticker, exc)
 
     # PEG fallback 2: Use earningsGrowth field
     if (peg_ratio is None or peg_ratio == 0) and pe_ratio and earnings_growth and earnings_growth > 0.01:
         try:
             peg_ratio = round(pe_ratio / (earnings_growth * 100 if earnings_growth < 1 else earnings_growth), 2)
-        except:
+        except (TypeError, ZeroDivisionError):
             peg_ratio = None
 
+    # PEG fallback 3: growth implied by forward vs trailing EPS
+    forward_eps = info.get("forwardEps")
+    trailing_eps = info.get("trailingEps")
+    if (peg_ratio is None or peg_ratio == 0) and pe_ratio and forward_eps and trailing_eps and trailing_eps > 0:
+        projected_growth = ((forward_eps / trailing_eps) - 1) * 100
+        if projected_growth > 0:
+            peg_ratio = round(pe_ratio / projected_growth, 2)
+
     fcf_per_share = (free_cash_flow / shares_outstanding) if (free_cash_flow and shares_outstanding) else None
     price_to_cashflow = (current_price / fcf_per_share) if fcf_per_share else None
 
@@ -106,23 +179,209 @@ def get_stock_info(ticker):
         "roe": info.get("returnOnEquity"),
         "roa": info.get("returnOnAssets"),
         "gross_margin": info.get("grossMargins"),
-        "operating_margin": info.get("operatingMargins")
+        "operating_margin": info.get("operatingMargins"),
+        "market_cap": info.get("marketCap"),
+        "revenue_growth": info.get("revenueGrowth"),
+        "profit_margin": info.get("profitMargins"),
+        "earnings_growth": earnings_growth,
+        "inst_ownership": info.get("heldPercentInstitutions"),
+        "insider_ownership": info.get("heldPercentInsiders"),
+        # Not frame columns: when the ticker reports (incremental refresh) and
+        # its labels (symbol index)
+        "earnings_timestamp": info.get("earningsTimestamp"),
+        "long_name": info.get("longName"),
+        "sector": info.get("sector"),
+        "industry": info.get("industry"),
+        "exchange": info.get("exchange")
     }
 
 
-@st.cache_data(ttl=3600)
-def get_bulk_stock_data(tickers=None, limit=30):
+def fetch_bulk_stock_info(tickers, timeout=DEFAULT_TICKER_TIMEOUT, scheduler=None):
+    """Fetch fundamentals for many tickers in parallel.
+
+    Requests go through the shared fetch scheduler (rate limit, retries,
+    circuit breaker). Returns one record per ticker, in input order, with a
+    ``status`` (ok, error, rate_limited, circuit_open or timeout) and an
+    ``error`` message. Tickers that fail keep their row so callers can see
+    what is missing instead of getting a silently shorter frame.
+    """
+    scheduler = scheduler or get_scheduler()
+    records = []
+    for outcome in scheduler.run(tickers, _fetch_stock_info, timeout=timeout):
+        if outcome["status"] == "ok":
+            record = dict(outcome["value"], status="ok", error=None)
+        else:
+            record = {"symbol": outcome["key"], "status": outcome["status"], "error": outcome["error"]}
+            logger.warning("Fundamentals fetch for %s failed (%s): %s",
+                           outcome["key"], outcome["status"], outcome["error"])
+        records.append(record)
+    return records
+
+
+# Arrow tables are immutable, so every session can share the cached table
+# itself; st.cache_data would unpickle a fresh copy of the frame on every hit.
+# The table is published to the snapshot store and served from its memory
+# map, so worker processes share one copy through the page cache too.
+@st.cache_resource(ttl=300)
+def get_bulk_stock_table(tickers=None, limit=None, timeout=DEFAULT_TICKER_TIMEOUT):
     if tickers is None:
         tickers = get_dow30_tickers()
+    tickers = list(tickers)[:limit]
 
-    data = []
-    for t in tickers[:limit]:
-        try:
-            data.append(get_stock_info(t))
-        except Exception:
-            continue
-    return pd.DataFrame(data)
-
-# Get and save
-df = get_bulk_stock_data()
-df.to_excel("dowjones_lynch_project_data.xlsx", index=False)
+    records = []
+    for start in range(0, len(tickers), FETCH_CHUNK_SIZE):
+        chunk = tickers[start:start + FETCH_CHUNK_SIZE]
+        began = time.monotonic()
+        records += disk_cache.get_many(
+            chunk,
+            lambda missing: fetch_bulk_stock_info(missing, timeout=timeout)
+        )
+        elapsed = time.monotonic() - began
+        if elapsed > CHUNK_LATENCY_BUDGET:
+            logger.warning("Fundamentals chunk of %d tickers took %.1fs (budget %ds)",
+                           len(chunk), elapsed, CHUNK_LATENCY_BUDGET)
+
+    version = snapshot_version(records)
+    dataset = snapshot_store.dataset_name(tickers)
+    table = snapshot_store.open_snapshot(dataset, version)
+    if table is None:
+        table = records_to_table(records).replace_schema_metadata({"snapshot_version": version})
+        snapshot_store.publish(dataset, table, version)
+        table = snapshot_store.open_snapshot(dataset, version)
+
+    if len(table) and table.nbytes > MEMORY_BUDGET_PER_TICKER * len(table):
+        logger.warning("Fundamentals table uses %d bytes per ticker (budget %d)",
+                       table.nbytes // len(table), MEMORY_BUDGET_PER_TICKER)
+    return table
+
+
+def get_bulk_stock_data(tickers=None, limit=None, timeout=DEFAULT_TICKER_TIMEOUT):
+    """Fundamentals frame for ``tickers``, a zero-copy view of the shared table."""
+    return table_to_frame(get_bulk_stock_table(tickers, limit, timeout))
+
+
+def get_published_row(tickers, ticker):
+    """The row for ``ticker`` in the currently published snapshot of ``tickers``.
+
+    Reads the memory-mapped snapshot only; returns None, without fetching,
+    if nothing is published yet or ``ticker`` is missing or failed there.
+    """
+    tickers = list(tickers)
+    if ticker not in tickers:
+        return None
+    table = snapshot_store.open_snapshot(snapshot_store.dataset_name(tickers))
+    # Rows follow the ticker list the snapshot was published for
+    position = tickers.index(ticker)
+    if table is None or position >= len(table):
+        return None
+    row = table_to_frame(table.slice(position, 1)).iloc[0]
+    if row["symbol"] != ticker or row["status"] != "ok":
+        return None
+    return row
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _column(values, field):
+    if pa.types.is_dictionary(field.type):
+        return pa.array(values, pa.string()).dictionary_encode()
+    if pa.types.is_string(field.type):
+        return pa.array(values, pa.string())
+    dtype = field.type.to_pandas_dtype()
+    # Wrapping a NumPy array keeps NaN as NaN and shares its buffer
+    return pa.array(np.fromiter((_as_float(v) for v in values), dtype=dtype, count=len(values)))
+
+
+def records_to_table(records):
+    """Build the typed fundamentals table, column by column, from records."""
+    names = FUNDAMENTAL_COLUMNS + ["status", "error"]
+    columns = [_column([r.get(col) for r in records], FUNDAMENTAL_SCHEMA.field(col)) for col in names]
+    table = pa.Table.from_arrays(columns, schema=pa.schema([FUNDAMENTAL_SCHEMA.field(col) for col in names]))
+    # Page analytics are stored with the snapshot so they can be ranked and screened
+    analytics = analytics_frame(table.to_pandas(split_blocks=True))
+    for col in ANALYTICS_COLUMNS:
+        field = FUNDAMENTAL_SCHEMA.field(col)
+        table = table.append_column(field, pa.array(analytics[col].to_numpy().astype(field.type.to_pandas_dtype())))
+    return table
+
+
+def table_to_frame(table):
+    # split_blocks keeps one block per column, so float columns are views of
+    # the Arrow buffers instead of being consolidated into a copied 2-D block
+    df = table.to_pandas(split_blocks=True)
+    metadata = table.schema.metadata or {}
+    if b"snapshot_version" in metadata:
+        df.attrs["snapshot_version"] = metadata[b"snapshot_version"].decode()
+    return df
+
+
+def records_to_frame(records):
+    return table_to_frame(records_to_table(records))
+
+
+def drop_failed(df):
+    # Failed tickers keep a row with their status; say which ones and why, then leave them out
+    failed = df[df["status"] != "ok"]
+    if not len(failed):
+        # Nothing to drop: hand back the shared, read-only view as is
+        return df
+    by_status = failed.groupby("status", observed=True)["symbol"].agg(", ".join)
+    st.warning("Could not load data for " + "; ".join(f"{symbols} ({status})" for status, symbols in by_status.items()))
+    return df[df["status"] == "ok"].copy()
+
+
+def snapshot_version(records):
+    # Content hash of the fetched records; lets downstream caches (filter
+    # masks, models) key on the data without rescanning the frame
+    payload = json.dumps(records, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def _benchmark(n=5000, repeat=5):
+    import pickle
+    import random
+
+    rng = random.Random(0)
+    records = []
+    for i in range(n):
+        record = {"symbol": f"T{i:04d}", "name": f"Company {i} Holdings Inc.", "status": "ok", "error": None}
+        for col in FUNDAMENTAL_COLUMNS[2:]:
+            # ~15% of fields missing, and Yahoo now and then sends "Infinity" for a ratio
+            roll = rng.random()
+            record[col] = None if roll < 0.15 else "Infinity" if roll < 0.152 else rng.uniform(0, 1e9)
+        records.append(record)
+
+    def best_of(fn):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    # Before: a frame inferred from the list of dicts, as pandas < 3 builds it
+    # (object strings), handed out by st.cache_data as a pickled copy per hit
+    with pd.option_context("future.infer_string", False):
+        before = pd.DataFrame(records)
+    before_blob = pickle.dumps(before)
+    # After: the typed table, shared as is, viewed as a frame per hit
+    table = records_to_table(records)
+    after = table_to_frame(table)
+
+    object_cols = int((before.dtypes == object).sum())
+    print(f"{n} tickers, {len(before.columns)} columns ({object_cols} of them object dtype before)")
+    print(f"  before  {before.memory_usage(deep=True).sum() / n:6.0f} bytes/ticker  "
+          f"cache hit {best_of(lambda: pickle.loads(before_blob)) * 1e3:6.2f} ms (unpickle)")
+    print(f"  after   {table.nbytes / n:6.0f} bytes/ticker  "
+          f"cache hit {best_of(lambda: table_to_frame(table)) * 1e3:6.2f} ms (to_pandas)")
+    print(f"  frame view of the table: {after.memory_usage(deep=True).sum() / n:.0f} bytes/ticker, "
+          f"float columns share the Arrow buffers")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from utils.shared_cache import CACHE_DIR, lease
+
+# On-disk fundamentals cache shared by every process that runs the app, so a
+# restart or a new worker starts from the last known data instead of Yahoo.
+CACHE_PATH = os.path.join(CACHE_DIR, "fundamentals.sqlite3")
+
+FRESH_TTL = 3600            # younger than this: served as-is
+STALE_TTL = 7 * 86400       # younger than this: served, refreshed in the background
+KEEP_DAYS = 30              # fetch dates older than this are evicted
+EVICT_INTERVAL = 3600       # run eviction at most once an hour per process
+FETCH_LEASE_TTL = 300       # longest a worker may hold a batch fetch
+
+_lock = threading.Lock()
+_refreshing = set()
+_last_evict = 0.0
+
+
+@contextmanager
+def _connect():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS fundamentals ("
+        " symbol TEXT NOT NULL,"
+        " fetch_date TEXT NOT NULL,"
+        " fetched_at REAL NOT NULL,"
+        " payload TEXT NOT NULL,"
+        " PRIMARY KEY (symbol, fetch_date))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS refresh_state ("
+        " symbol TEXT PRIMARY KEY,"
+        " last_fetched REAL NOT NULL,"
+        " last_changed REAL,"
+        " changed_fields TEXT)"
+    )
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _to_json(value):
+    # numpy scalars sneak in from the income statement fallback
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def read_latest(symbols):
+    """Return {symbol: (record, fetched_at)} for the newest cached row per symbol."""
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    placeholders = ",".join("?" * len(symbols))
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT symbol, payload, MAX(fetched_at) FROM fundamentals"
+            f" WHERE symbol IN ({placeholders}) GROUP BY symbol",
+            symbols
+        ).fetchall()
+    # Rows written before records were stamped on write have no status yet
+    return {symbol: (dict({"status": "ok", "error": None}, **json.loads(payload)), fetched_at)
+            for symbol, payload, fetched_at in rows}
+
+
+def write_records(records, fetched_at=None):
+    """Persist successfully fetched records.
+
+    Only good records are ever written, so each one is stamped ``ok`` here;
+    records derived outside the bulk fetch (a single ticker view) carry no
+    status of their own and would otherwise read back as failed.
+    """
+    fetched_at = fetched_at or time.time()
+    fetch_date = date.fromtimestamp(fetched_at).isoformat()
+    rows = [
+        (r["symbol"], fetch_date, fetched_at, json.dumps(dict(r, status="ok", error=None), default=_to_json))
+        for r in records
+    ]
+    if not rows:
+        return
+    with _connect() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO fundamentals (symbol, fetch_date, fetched_at, payload)"
+            " VALUES (?, ?, ?, ?)",
+            rows
+        )
+    _maybe_evict()
+
+
+def read_refresh_state(symbols):
+    """Return {symbol: (last_fetched, last_changed)} for symbols seen by the incremental refresh."""
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    placeholders = ",".join("?" * len(symbols))
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT symbol, last_fetched, last_changed FROM refresh_state"
+            f" WHERE symbol IN ({placeholders})",
+            symbols
+        ).fetchall()
+    return {symbol: (last_fetched, last_changed) for symbol, last_fetched, last_changed in rows}
+
+
+def write_refresh_state(rows):
+    """Upsert (symbol, last_fetched, last_changed, changed_fields) rows."""
+    rows = [(s, fetched, changed, json.dumps(fields)) for s, fetched, changed, fields in rows]
+    if not rows:
+        return
+    with _connect() as conn:
+        conn.executemany(
+            "INSERT INTO refresh_state (symbol, last_fetched, last_changed, changed_fields)"
+            " VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(symbol) DO UPDATE SET"
+            " last_fetched = excluded.last_fetched,"
+            " last_changed = COALESCE(excluded.last_changed, refresh_state.last_changed),"
+            " changed_fields = CASE WHEN excluded.last_changed IS NULL"
+            "   THEN refresh_state.changed_fields ELSE excluded.changed_fields END",
+            rows
+        )
+
+
+def evict(keep_days=KEEP_DAYS):
+    cutoff = (date.today() - timedelta(days=keep_days)).isoformat()
+    with _connect() as conn:
+        conn.execute("DELETE FROM fundamentals WHERE fetch_date < ?", (cutoff,))
+
+
+def _maybe_evict():
+    global _last_evict
+    now = time.monotonic()
+    with _lock:
+        if _last_evict and now - _last_evict < EVICT_INTERVAL:
+            return
+        _last_evict = now
+    evict()
+
+
+def _refresh_in_background(symbols, fetch_many):
+    with _lock:
+        symbols = [s for s in symbols if s not in _refreshing]
+        _refreshing.update(symbols)
+    if not symbols:
+        return
+
+    def run():
+        try:
+            # Another worker already revalidating this batch is good enough
+            with lease("revalidate", _batch_key(symbols), FETCH_LEASE_TTL, wait=False) as token:
+                if token is not None:
+                    write_records([r for r in fetch_many(symbols) if r.get("status", "ok") == "ok"])
+        except Exception:
+            # Keep serving the stale rows; the next lookup will try again
+            pass
+        finally:
+            with _lock:
+                _refreshing.difference_update(symbols)
+
+    threading.Thread(target=run, name="lynch-revalidate", daemon=True).start()
+
+
+def _batch_key(symbols):
+    return hashlib.sha1(",".join(sorted(symbols)).encode()).hexdigest()
+
+
+def _fetch_missing(symbols, fetch_many, stale_ttl):
+    # Workers missing the same batch take turns: the first fetches and writes,
+    # the rest find its rows on disk once the lease is free
+    with lease("fundamentals", _batch_key(symbols), FETCH_LEASE_TTL):
+        now = time.time()
+        landed = {s: hit[0] for s, hit in read_latest(symbols).items() if now - hit[1] < stale_ttl}
+        todo = [s for s in symbols if s not in landed]
+        fetched = fetch_many(todo) if todo else []
+        write_records([r for r in fetched if r.get("status", "ok") == "ok"])
+    return list(landed.values()) + fetched
+
+
+def get_many(symbols, fetch_many, fresh_ttl=FRESH_TTL, stale_ttl=STALE_TTL):
+    """Stale-while-revalidate lookup for a batch of symbols.
+
+    ``fetch_many(symbols)`` must return one record per symbol. Fresh rows are
+    returned from disk, stale rows are returned from disk while a background
+    thread refetches them, and missing or expired rows are fetched inline.
+    Records come back in the order of ``symbols``.
+    """
+    symbols = list(symbols)
+    now = time.time()
+    cached = read_latest(symbols)
+
+    results = {}
+    stale, missing = [], []
+    for symbol in symbols:
+        hit = cached.get(symbol)
+        age = now - hit[1] if hit else None
+        if hit and age < stale_ttl:
+            results[symbol] = hit[0]
+            if age >= fresh_ttl:
+                stale.append(symbol)
+        else:
+            missing.append(symbol)
+
+    if missing:
+        fetched = _fetch_missing(missing, fetch_many, stale_ttl)
+        results.update((r["symbol"], r) for r in fetched)
+    if stale:
+        _refresh_in_background(stale, fetch_many)
+
+    return [results[s] for s in symbols if s in results]
+
+
+def get_one(symbol, fetch, fresh_ttl=FRESH_TTL, stale_ttl=STALE_TTL):
+    records = get_many([symbol], lambda symbols: [fetch(s) for s in symbols], fresh_ttl, stale_ttl)
+    return records[0]
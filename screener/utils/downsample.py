@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Server-side thinning of chart payloads. Candles are merged into buckets
+# that keep the true open/high/low/close and summed volume; line overlays go
+# through LTTB, which keeps the points that carry the visual shape. Either
+# way the figure never holds more points than the chart can show.
+DEFAULT_CHART_WIDTH = int(os.environ.get("LYNCH_CHART_WIDTH", 1200))   # px
+POINTS_PER_PIXEL = 0.5     # a candle needs ~2px to be readable
+
+
+def point_budget(width_px=DEFAULT_CHART_WIDTH, points_per_px=POINTS_PER_PIXEL):
+    return max(2, int(width_px * points_per_px))
+
+
+def downsample_ohlc(hist, max_points):
+    """Aggregate consecutive bars into at most ``max_points`` OHLCV buckets.
+
+    Each bucket is labelled with its first bar's timestamp and keeps that
+    bar's Open, the last bar's Close, the High max, the Low min and the
+    summed Volume. Extra columns keep their last value per bucket.
+    """
+    n = len(hist)
+    if n <= max_points:
+        return hist
+    size = -(-n // max_points)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+
+    out = {}
+    for column in hist.columns:
+        values = hist[column].to_numpy(dtype="float64")
+        if column == "Open":
+            out[column] = values[starts]
+        elif column == "High":
+            out[column] = np.fmax.reduceat(values, starts)
+        elif column == "Low":
+            out[column] = np.fmin.reduceat(values, starts)
+        elif column == "Volume":
+            out[column] = np.add.reduceat(np.nan_to_num(values), starts)
+        else:
+            out[column] = values[ends]
+    return pd.DataFrame(out, index=hist.index[starts])
+
+
+def lttb(y, max_points, x=None):
+    """Largest-Triangle-Three-Buckets: indices of the points to keep.
+
+    NaN points are dropped first, so rolling-window warm-up gaps don't
+    count against the budget.
+    """
+    y = np.asarray(y, dtype="float64")
+    keep = np.flatnonzero(~np.isnan(y))
+    if len(keep) <= max_points or max_points < 3:
+        return keep
+    x = keep.astype("float64") if x is None else np.asarray(x, dtype="float64")[keep]
+    y = y[keep]
+
+    n = len(keep)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket is the triangle's third corner
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return keep[selected]
+
+
+def downsample_line(series, max_points):
+    """LTTB-thinned copy of a line overlay (e.g. a moving average)."""
+    idx = lttb(series.to_numpy(dtype="float64"), max_points)
+    return series.iloc[idx]
+
+
+def volume_colors(open_, close):
+    return np.where(np.asarray(close) >= np.asarray(open_), "green", "red")
@@ -0,0 +1,219 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:  # older yfinance releases
+    YFRateLimitError = None
+
+# Scheduler for upstream fetches: a token bucket caps the request rate, each
+# host gets its own concurrency cap and circuit breaker, and failed calls are
+# retried with jittered exponential backoff. Every call ends with a status,
+# so callers can tell "throttled" from "no data" instead of losing rows.
+DEFAULT_HOST = "yahoo"
+DEFAULT_RATE = 10.0             # sustained requests per second
+DEFAULT_BURST = 32              # enough to start the Dow 30 at once
+DEFAULT_HOST_LIMIT = 32
+DEFAULT_MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+BREAKER_THRESHOLD = 10          # consecutive failures before the breaker opens
+BREAKER_RESET = 60.0            # seconds before a half-open probe is allowed
+
+logger = logging.getLogger(__name__)
+
+
+def _status_code(exc):
+    # requests and curl_cffi HTTP errors carry the response they failed on
+    return getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def is_rate_limited(exc):
+    if YFRateLimitError is not None and isinstance(exc, YFRateLimitError):
+        return True
+    if _status_code(exc) == 429:
+        return True
+    text = str(exc)
+    return "429" in text or "Too Many Requests" in text or "Rate limit" in text
+
+
+def is_transient(exc):
+    status = _status_code(exc)
+    if status is not None and 400 <= status < 500 and status != 429:
+        # The request itself is bad (e.g. 404 for a delisted ticker); retrying won't help
+        return False
+    # requests' exceptions derive from OSError, as do socket timeouts
+    return is_rate_limited(exc) or isinstance(exc, (OSError, TimeoutError))
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    # "Full jitter": spreads retries out so throttled workers don't retry in lockstep
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            # After the reset timeout one probe goes through; its result
+            # decides whether the breaker closes again
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                if self.opened_at is None or self.probing:
+                    logger.warning("Circuit opened after %d consecutive failures", self.failures)
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+
+class FetchScheduler:
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_workers=DEFAULT_HOST_LIMIT,
+                 host_limits=None, max_retries=DEFAULT_MAX_RETRIES):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_workers = max_workers
+        self.host_limits = host_limits or {}
+        self.max_retries = max_retries
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lynch-fetch")
+        self._semaphores = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.host_limits.get(host, DEFAULT_HOST_LIMIT))
+                self._breakers[host] = CircuitBreaker()
+            return self._semaphores[host], self._breakers[host]
+
+    def breaker(self, host=DEFAULT_HOST):
+        return self._host_state(host)[1]
+
+    def _call(self, key, fn, host):
+        semaphore, breaker = self._host_state(host)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                return {"key": key, "value": None, "status": "circuit_open",
+                        "error": f"circuit open for {host}", "attempts": attempt}
+
+            self.bucket.acquire()
+            with semaphore:
+                try:
+                    value = fn(key)
+                except Exception as exc:
+                    error = exc
+                else:
+                    breaker.record_success()
+                    return {"key": key, "value": value, "status": "ok", "error": None, "attempts": attempt + 1}
+
+            rate_limited = is_rate_limited(error)
+            if not is_transient(error):
+                # Upstream answered; the ticker itself is the problem
+                breaker.record_success()
+                return {"key": key, "value": None, "status": "error",
+                        "error": f"{type(error).__name__}: {error}", "attempts": attempt + 1}
+
+            breaker.record_failure()
+            if attempt < self.max_retries:
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            return {"key": key, "value": None, "status": "rate_limited" if rate_limited else "error",
+                    "error": f"{type(error).__name__}: {error}", "attempts": attempt + 1}
+
+    def run(self, keys, fn, host=DEFAULT_HOST, timeout=None):
+        """Call ``fn(key)`` for every key under the scheduler's limits.
+
+        Returns one outcome dict per key, in order, with ``key``, ``value``,
+        ``status`` (ok, error, rate_limited, circuit_open or timeout),
+        ``error`` and ``attempts``. ``timeout`` is per key, counted from when
+        its wave of work starts.
+        """
+        keys = list(keys)
+        if not keys:
+            return []
+
+        futures = [self.executor.submit(self._call, key, fn, host) for key in keys]
+        deadline = None
+        if timeout is not None:
+            # Waves the pool needs, plus time to drain the token bucket beyond its burst
+            waves = -(-len(keys) // self.max_workers)
+            deadline = time.monotonic() + timeout * waves + max(0, len(keys) - self.bucket.capacity) / self.bucket.rate
+
+        outcomes = []
+        for key, future in zip(keys, futures):
+            try:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                outcomes.append(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                future.cancel()
+                outcomes.append({"key": key, "value": None, "status": "timeout",
+                                 "error": f"no response within {timeout}s", "attempts": 0})
+        return outcomes
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    # One scheduler per process, so the rate limit covers every page and job
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FetchScheduler()
+        return _scheduler
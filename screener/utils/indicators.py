@@ -0,0 +1,384 @@
+import os
+import pickle
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from utils import price_store
+
+# Technical indicators in two forms that give the same numbers:
+#   - streaming classes keep rolling state and take one bar at a time, O(1)
+#     per update, so stored series extend without recomputing history;
+#   - batch functions take (time x ticker) arrays and compute everything at
+#     once with NumPy, for screens across a whole universe.
+# NaN bars (gaps, not-yet-listed tickers) are skipped and leave state as is.
+
+
+class SMA:
+    outputs = 1
+
+    def __init__(self, window=20):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+
+    def update(self, bar):
+        close = bar["close"]
+        if np.isnan(close):
+            return self.value()
+        self.values.append(close)
+        self.total += close
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+        return self.value()
+
+    def value(self):
+        return self.total / self.window if len(self.values) == self.window else np.nan
+
+
+class EMA:
+    outputs = 1
+
+    def __init__(self, span=20):
+        self.alpha = 2 / (span + 1)
+        self.current = np.nan
+
+    def update(self, bar):
+        close = bar["close"]
+        if not np.isnan(close):
+            self.current = close if np.isnan(self.current) else self.current + self.alpha * (close - self.current)
+        return self.current
+
+
+class RSI:
+    outputs = 1
+
+    def __init__(self, period=14):
+        self.alpha = 1 / period
+        self.prev = np.nan
+        self.gain = np.nan
+        self.loss = np.nan
+
+    def update(self, bar):
+        close = bar["close"]
+        if np.isnan(close):
+            return self.value()
+        if not np.isnan(self.prev):
+            change = close - self.prev
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            if np.isnan(self.gain):
+                self.gain, self.loss = gain, loss
+            else:
+                # Wilder smoothing
+                self.gain += self.alpha * (gain - self.gain)
+                self.loss += self.alpha * (loss - self.loss)
+        self.prev = close
+        return self.value()
+
+    def value(self):
+        if np.isnan(self.gain):
+            return np.nan
+        if self.loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self.gain / self.loss)
+
+
+class Bollinger:
+    outputs = 3     # middle, upper, lower
+
+    def __init__(self, window=20, k=2.0):
+        self.window = window
+        self.k = k
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, bar):
+        close = bar["close"]
+        if not np.isnan(close):
+            self.values.append(close)
+            self.total += close
+            self.total_sq += close * close
+            if len(self.values) > self.window:
+                old = self.values.popleft()
+                self.total -= old
+                self.total_sq -= old * old
+        if len(self.values) < self.window:
+            return (np.nan, np.nan, np.nan)
+        mean = self.total / self.window
+        std = np.sqrt(max(self.total_sq / self.window - mean * mean, 0.0))
+        return (mean, mean + self.k * std, mean - self.k * std)
+
+
+class VWAP:
+    outputs = 1
+
+    def __init__(self):
+        self.pv = 0.0
+        self.volume = 0.0
+
+    def update(self, bar):
+        volume = bar["volume"]
+        typical = (bar["high"] + bar["low"] + bar["close"]) / 3
+        if not (np.isnan(typical) or np.isnan(volume)):
+            self.pv += typical * volume
+            self.volume += volume
+        return self.pv / self.volume if self.volume else np.nan
+
+
+class ATR:
+    outputs = 1
+
+    def __init__(self, period=14):
+        self.alpha = 1 / period
+        self.prev_close = np.nan
+        self.current = np.nan
+
+    def update(self, bar):
+        high, low, close = bar["high"], bar["low"], bar["close"]
+        if np.isnan(close):
+            return self.current
+        true_range = high - low
+        if not np.isnan(self.prev_close):
+            true_range = max(true_range, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.current = true_range if np.isnan(self.current) else self.current + self.alpha * (true_range - self.current)
+        self.prev_close = close
+        return self.current
+
+
+INDICATORS = {
+    "sma": SMA,
+    "ema": EMA,
+    "rsi": RSI,
+    "bollinger": Bollinger,
+    "vwap": VWAP,
+    "atr": ATR,
+}
+
+
+def spec_key(spec):
+    """("sma", 20) -> "sma_20"; ("vwap",) -> "vwap"."""
+    return "_".join(str(part) for part in spec)
+
+
+def output_columns(spec):
+    key = spec_key(spec)
+    if spec[0] == "bollinger":
+        return [f"{key}_mid", f"{key}_upper", f"{key}_lower"]
+    return [key]
+
+
+# ---------------- Batch (time x ticker) ----------------
+
+def _as_2d(values):
+    values = np.asarray(values, dtype="float64")
+    return values[:, None] if values.ndim == 1 else values
+
+
+def _shape_like(result, values):
+    return result[:, 0] if np.ndim(values) == 1 else result
+
+
+def _rolling_sum(x, window):
+    # Sums over the last `window` valid values per column; NaNs are skipped,
+    # like the streaming classes, and the last value is held across gaps.
+    # Returns (sum, sum of squares).
+    valid = ~np.isnan(x)
+    count = np.cumsum(valid, axis=0)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=0)
+    csq = np.cumsum(np.where(valid, x * x, 0.0), axis=0)
+    # Running totals after the k-th valid value of each column
+    by_count_sum = np.zeros((x.shape[0] + 1, x.shape[1]))
+    by_count_sq = np.zeros((x.shape[0] + 1, x.shape[1]))
+    rows, cols = np.nonzero(valid)
+    by_count_sum[count[rows, cols], cols] = csum[rows, cols]
+    by_count_sq[count[rows, cols], cols] = csq[rows, cols]
+
+    full = count >= window
+    start = np.where(full, count - window, 0)
+    cols = np.broadcast_to(np.arange(x.shape[1]), x.shape)
+    out_sum = np.where(full, csum - by_count_sum[start, cols], np.nan)
+    out_sq = np.where(full, csq - by_count_sq[start, cols], np.nan)
+    return out_sum, out_sq
+
+
+def _previous_valid(x):
+    # The last valid value strictly before each row, per column
+    rows = np.where(~np.isnan(x), np.arange(x.shape[0])[:, None], 0)
+    filled = x[np.maximum.accumulate(rows, axis=0), np.arange(x.shape[1])]
+    return np.vstack([np.full((1, x.shape[1]), np.nan), filled[:-1]])
+
+
+def _ewm(x, alpha):
+    # Recursive smoothing seeded with the first valid value; vectorized
+    # across tickers, one step per bar
+    out = np.full(x.shape, np.nan)
+    state = np.full(x.shape[1], np.nan)
+    for t in range(x.shape[0]):
+        row = x[t]
+        fresh = ~np.isnan(row)
+        seed = fresh & np.isnan(state)
+        state = np.where(seed, row, state)
+        step = fresh & ~seed
+        state = np.where(step, state + alpha * (row - state), state)
+        out[t] = state
+    return out
+
+
+def sma(close, window=20):
+    x = _as_2d(close)
+    total, _ = _rolling_sum(x, window)
+    return _shape_like(total / window, close)
+
+
+def ema(close, span=20):
+    return _shape_like(_ewm(_as_2d(close), 2 / (span + 1)), close)
+
+
+def rsi(close, period=14):
+    x = _as_2d(close)
+    change = x - _previous_valid(x)
+    # NaN changes (gaps, first bar) leave the smoothed state as is
+    gain = _ewm(np.where(np.isnan(change), np.nan, np.maximum(change, 0.0)), 1 / period)
+    loss = _ewm(np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0)), 1 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+    out[np.isnan(gain)] = np.nan
+    return _shape_like(out, close)
+
+
+def bollinger(close, window=20, k=2.0):
+    x = _as_2d(close)
+    total, total_sq = _rolling_sum(x, window)
+    mean = total / window
+    std = np.sqrt(np.maximum(total_sq / window - mean * mean, 0.0))
+    return tuple(_shape_like(band, close) for band in (mean, mean + k * std, mean - k * std))
+
+
+def vwap(high, low, close, volume):
+    typical = (_as_2d(high) + _as_2d(low) + _as_2d(close)) / 3
+    vol = _as_2d(volume)
+    valid = ~(np.isnan(typical) | np.isnan(vol))
+    pv = np.cumsum(np.where(valid, typical * vol, 0.0), axis=0)
+    cum_vol = np.cumsum(np.where(valid, vol, 0.0), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(cum_vol > 0, pv / cum_vol, np.nan)
+    return _shape_like(out, close)
+
+
+def atr(high, low, close, period=14):
+    h, l, c = _as_2d(high), _as_2d(low), _as_2d(close)
+    prev = _previous_valid(c)
+    with np.errstate(invalid="ignore"):
+        true_range = np.fmax(h - l, np.fmax(np.abs(h - prev), np.abs(l - prev)))
+    true_range[np.isnan(c)] = np.nan
+    return _shape_like(_ewm(true_range, 1 / period), close)
+
+
+def compute_batch(spec, high=None, low=None, close=None, volume=None):
+    """Compute one indicator spec over (time x ticker) arrays; returns a list of outputs."""
+    name, params = spec[0], spec[1:]
+    if name == "sma":
+        return [sma(close, *params)]
+    if name == "ema":
+        return [ema(close, *params)]
+    if name == "rsi":
+        return [rsi(close, *params)]
+    if name == "bollinger":
+        return list(bollinger(close, *params))
+    if name == "vwap":
+        return [vwap(high, low, close, volume)]
+    if name == "atr":
+        return [atr(high, low, close, *params)]
+    raise KeyError(f"Unknown indicator: {name!r}")
+
+
+# ---------------- Cached per-series values ----------------
+# Each (interval, ticker) keeps a sidecar next to its price file with the
+# computed values and the streaming state as of the second-to-last bar. The
+# last stored bar can still be revised by the next append, so updates
+# resume from that checkpoint and only feed the new bars through.
+
+_cache_lock = threading.Lock()
+
+
+def _cache_path(ticker, interval):
+    data_path, _ = price_store._paths(ticker, interval)
+    return data_path[:-len(".npy")] + ".indicators.pkl"
+
+
+def _load_cache(path):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return {}
+
+
+def _save_cache(path, cache):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(cache, f)
+    os.replace(tmp, path)
+
+
+def _extend(entry, spec, bars):
+    # Reuse cached values up to the checkpoint if the stored bars still agree
+    ts = bars["ts"]
+    start = 0
+    if entry is not None:
+        n = entry["checkpoint_n"]
+        if 0 < n <= len(bars) and ts[n - 1] == entry["checkpoint_ts"]:
+            start = n
+    if start:
+        indicator = pickle.loads(entry["state"])
+        values = entry["values"][:start]
+    else:
+        indicator = INDICATORS[spec[0]](*spec[1:])
+        values = np.empty((0, indicator.outputs))
+
+    new = np.empty((len(bars) - start, indicator.outputs))
+    state = None
+    for i, bar in enumerate(bars[start:]):
+        if start + i == len(bars) - 1:
+            state = pickle.dumps(indicator)
+        new[i] = indicator.update(bar)
+    if state is None:
+        state = pickle.dumps(indicator)
+
+    return {
+        "values": np.concatenate([values, new]),
+        "state": state,
+        "checkpoint_n": len(bars) - 1,
+        "checkpoint_ts": int(ts[-2]) if len(bars) > 1 else None,
+    }
+
+
+def indicator_frame(ticker, interval, specs):
+    """Indicator values for every stored bar of (ticker, interval), indexed like get_history()."""
+    bars, meta = price_store.load_bars(ticker, interval)
+    tz = meta.get("tz", "UTC")
+    index = pd.DatetimeIndex(np.asarray(bars["ts"]), tz="UTC").tz_convert(tz)
+    if not len(bars):
+        return pd.DataFrame(index=index)
+
+    path = _cache_path(ticker, interval)
+    with _cache_lock:
+        cache = _load_cache(path)
+        changed = False
+        columns = {}
+        for spec in specs:
+            key = spec_key(spec)
+            entry = cache.get(key)
+            if entry is None or entry.get("fetched_at") != meta.get("fetched_at"):
+                entry = _extend(entry, spec, bars)
+                entry["fetched_at"] = meta.get("fetched_at")
+                cache[key] = entry
+                changed = True
+            for column, values in zip(output_columns(spec), entry["values"].T):
+                columns[column] = values
+        if changed:
+            _save_cache(path, cache)
+    return pd.DataFrame(columns, index=index)
@@ -1,3 +1,15 @@
+import numpy as np
+import pandas as pd
+
+# Criterion cutoffs, shared by the scorer, the Screener filters and the
+# threshold sensitivity analysis
+PEG_MAX = 1
+PE_MAX = 20
+DE_MAX = 0.5
+DIV_YIELD_MIN = 0.02
+PCF_MIN = 5
+
+
 def score_lynch_criteria(stock):
     score = 0
     reasons = []
@@ -7,21 +19,21 @@ def score_lynch_criteria(stock):
 
     # 1. PEG Ratio < 1
     peg = safe_get("peg_ratio")
-    if peg is not None and peg < 1:
+    if peg is not None and peg < PEG_MAX:
         score += 1
-        reasons.append("PEG < 1")
+        reasons.append(f"PEG < {PEG_MAX:g}")
 
     # 2. P/E Ratio < 20
     pe = safe_get("pe_ratio")
-    if pe is not None and pe < 20:
+    if pe is not None and pe < PE_MAX:
         score += 1
-        reasons.append("P/E < 20")
+        reasons.append(f"P/E < {PE_MAX:g}")
 
     # 3. Debt/Equity < 0.5
     de = safe_get("de_ratio")
-    if de is not None and de < 0.5:
+    if de is not None and de < DE_MAX:
         score += 1
-        reasons.append("D/E < 0.5")
+        reasons.append(f"D/E < {DE_MAX:g}")
 
     # 4. Cash > Debt
     cash = safe_get("cash")
@@ -32,14 +44,99 @@ def score_lynch_criteria(stock):
 
     # 5. Dividend Yield > 2%
     div = safe_get("div_yield")
-    if div is not None and div > 0.02:
+    if div is not None and div > DIV_YIELD_MIN:
         score += 1
-        reasons.append("Div Yield > 2%")
+        reasons.append(f"Div Yield > {DIV_YIELD_MIN:.0%}")
 
     # 6. Price to Cash Flow > 5
     pcf = safe_get("price_to_cashflow")
-    if pcf is not None and pcf > 5:
+    if pcf is not None and pcf > PCF_MIN:
         score += 1
-        reasons.append("P/CF > 5")
+        reasons.append(f"P/CF > {PCF_MIN:g}")
 
     return score, reasons
+
+
+# Columnar version of score_lynch_criteria. Each criterion owns one bit of
+# the mask, in the same order the scalar function checks them.
+LYNCH_CRITERIA = [
+    (f"PEG < {PEG_MAX:g}", lambda c: c["peg_ratio"] < PEG_MAX),
+    (f"P/E < {PE_MAX:g}", lambda c: c["pe_ratio"] < PE_MAX),
+    (f"D/E < {DE_MAX:g}", lambda c: c["de_ratio"] < DE_MAX),
+    ("Cash > Debt", lambda c: c["cash"] > c["debt"]),
+    (f"Div Yield > {DIV_YIELD_MIN:.0%}", lambda c: c["div_yield"] > DIV_YIELD_MIN),
+    (f"P/CF > {PCF_MIN:g}", lambda c: c["price_to_cashflow"] > PCF_MIN),
+]
+
+_CRITERIA_COLUMNS = ["peg_ratio", "pe_ratio", "de_ratio", "cash", "debt", "div_yield", "price_to_cashflow"]
+
+# reasons list for every possible mask, so rows only need a table lookup
+_REASONS_BY_MASK = np.empty(1 << len(LYNCH_CRITERIA), dtype=object)
+for _mask in range(len(_REASONS_BY_MASK)):
+    _REASONS_BY_MASK[_mask] = [label for bit, (label, _) in enumerate(LYNCH_CRITERIA) if _mask >> bit & 1]
+
+
+def score_lynch_frame(df):
+    """Score every row of a fundamentals frame in one vectorized pass.
+
+    Returns a frame aligned with ``df`` holding ``score``, the per-criterion
+    bitmask ``criteria_mask`` and the ``reasons`` list. Missing values fail
+    their criterion, exactly like score_lynch_criteria.
+    """
+    columns = {}
+    for col in _CRITERIA_COLUMNS:
+        values = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        columns[col] = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64")
+
+    mask = np.zeros(len(df), dtype=np.uint8)
+    # NaN compares False, so missing data never sets a bit
+    with np.errstate(invalid="ignore"):
+        for bit, (_, test) in enumerate(LYNCH_CRITERIA):
+            mask |= test(columns).astype(np.uint8) << bit
+
+    score = np.unpackbits(mask[:, None], axis=1).sum(axis=1)
+    return pd.DataFrame({
+        "score": score.astype(np.int64),
+        "criteria_mask": mask,
+        "reasons": _REASONS_BY_MASK[mask],
+    }, index=df.index)
+
+
+def _benchmark(sizes=(30, 500, 5000), repeat=3):
+    import time
+
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        df = pd.DataFrame({
+            "peg_ratio": rng.uniform(0, 3, n),
+            "pe_ratio": rng.uniform(5, 40, n),
+            "de_ratio": rng.uniform(0, 2, n),
+            "cash": rng.uniform(0, 1e10, n),
+            "debt": rng.uniform(0, 1e10, n),
+            "div_yield": rng.uniform(0, 0.05, n),
+            "price_to_cashflow": rng.uniform(0, 30, n),
+        })
+        # knock out ~10% of values to exercise the missing-data path
+        df = df.mask(rng.random(df.shape) < 0.1)
+        df = df.astype(object).where(df.notna(), None)
+
+        timings = {}
+        for label, run in [
+            ("row apply", lambda: df.apply(lambda row: score_lynch_criteria(row)[0], axis=1)),
+            ("vectorized", lambda: score_lynch_frame(df)["score"]),
+        ]:
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = run()
+                best = min(best, time.perf_counter() - start)
+            timings[label] = (best, result)
+
+        assert (timings["row apply"][1].to_numpy() == timings["vectorized"][1].to_numpy()).all()
+        row_time, vec_time = timings["row apply"][0], timings["vectorized"][0]
+        print(f"{n:>6} rows  row apply {row_time * 1e3:8.2f} ms  vectorized {vec_time * 1e3:7.2f} ms  "
+              f"speedup {row_time / vec_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    _benchmark()
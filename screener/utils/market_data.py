@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import pandas as pd
+import yfinance as yf
+
+from utils.disk_cache import CACHE_DIR
+
+# Every market-data call in the app goes through a provider so pages can run
+# against live Yahoo data, record what they saw, or replay it offline.
+#
+#   LYNCH_DATA_PROVIDER   yfinance (default), record or replay
+#   LYNCH_REPLAY_DIR      where recordings live (default: .cache/replay)
+#   LYNCH_REPLAY_LATENCY  seconds of synthetic latency per replayed call
+#   LYNCH_REPLAY_JITTER   extra random latency, uniform in [0, jitter]
+DEFAULT_REPLAY_DIR = os.path.join(CACHE_DIR, "replay")
+
+
+class MissingRecordingError(LookupError):
+    pass
+
+
+class MarketDataProvider(ABC):
+    @abstractmethod
+    def info(self, ticker):
+        pass
+
+    @abstractmethod
+    def history(self, ticker, period=None, interval="1d", start=None, end=None):
+        pass
+
+    @abstractmethod
+    def download(self, tickers, period=None, interval="1d", start=None, end=None):
+        """Multi-ticker history as one wide frame with (field, ticker) columns."""
+
+    @abstractmethod
+    def income_stmt(self, ticker):
+        pass
+
+
+class YFinanceProvider(MarketDataProvider):
+    def info(self, ticker):
+        return yf.Ticker(ticker).info
+
+    def history(self, ticker, period=None, interval="1d", start=None, end=None):
+        return yf.Ticker(ticker).history(period=period, interval=interval, start=start, end=end)
+
+    def download(self, tickers, period=None, interval="1d", start=None, end=None):
+        return yf.download(
+            list(tickers), period=period, interval=interval, start=start, end=end,
+            group_by="column", auto_adjust=False, progress=False, threads=True
+        )
+
+    def income_stmt(self, ticker):
+        return yf.Ticker(ticker).income_stmt
+
+
+def _recording_path(root, kind, **params):
+    parts = []
+    for key, value in sorted(params.items()):
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ",".join(value)
+        parts.append(f"{key}={value}")
+    name = re.sub(r"[^A-Za-z0-9_.,=^-]", "_", "__".join(parts))
+    # Long multi-ticker keys get a stable digest instead of a huge filename
+    if len(name) > 120:
+        name = name[:80] + "__" + hashlib.sha1(name.encode()).hexdigest()
+    return os.path.join(root, kind, name)
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves responses captured by RecordingProvider from local files."""
+
+    def __init__(self, root=DEFAULT_REPLAY_DIR, latency=0.0, jitter=0.0):
+        self.root = root
+        self.latency = latency
+        self.jitter = jitter
+
+    def _sleep(self):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _load(self, kind, suffix, **params):
+        path = _recording_path(self.root, kind, **params) + suffix
+        self._sleep()
+        if not os.path.exists(path):
+            raise MissingRecordingError(f"No recording for {kind} {params} at {path}")
+        if suffix == ".json":
+            with open(path) as f:
+                return json.load(f)
+        return pd.read_pickle(path)
+
+    def info(self, ticker):
+        return self._load("info", ".json", ticker=ticker)
+
+    def history(self, ticker, period=None, interval="1d", start=None, end=None):
+        return self._load("history", ".pkl", ticker=ticker, period=period, interval=interval, start=start, end=end)
+
+    def download(self, tickers, period=None, interval="1d", start=None, end=None):
+        return self._load("download", ".pkl", tickers=sorted(tickers), period=period, interval=interval, start=start, end=end)
+
+    def income_stmt(self, ticker):
+        return self._load("income_stmt", ".pkl", ticker=ticker)
+
+
+class RecordingProvider(MarketDataProvider):
+    """Passes calls through to another provider and saves every response for replay."""
+
+    def __init__(self, upstream, root=DEFAULT_REPLAY_DIR):
+        self.upstream = upstream
+        self.root = root
+
+    def _save(self, value, kind, suffix, **params):
+        path = _recording_path(self.root, kind, **params) + suffix
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        if suffix == ".json":
+            with open(tmp, "w") as f:
+                json.dump(value, f, default=str)
+        else:
+            pd.to_pickle(value, tmp)
+        os.replace(tmp, path)
+        return value
+
+    def info(self, ticker):
+        return self._save(self.upstream.info(ticker), "info", ".json", ticker=ticker)
+
+    def history(self, ticker, period=None, interval="1d", start=None, end=None):
+        hist = self.upstream.history(ticker, period=period, interval=interval, start=start, end=end)
+        return self._save(hist, "history", ".pkl", ticker=ticker, period=period, interval=interval, start=start, end=end)
+
+    def download(self, tickers, period=None, interval="1d", start=None, end=None):
+        frame = self.upstream.download(tickers, period=period, interval=interval, start=start, end=end)
+        return self._save(frame, "download", ".pkl", tickers=sorted(tickers), period=period, interval=interval, start=start, end=end)
+
+    def income_stmt(self, ticker):
+        return self._save(self.upstream.income_stmt(ticker), "income_stmt", ".pkl", ticker=ticker)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def create_provider(kind=None):
+    kind = kind or os.environ.get("LYNCH_DATA_PROVIDER", "yfinance")
+    root = os.environ.get("LYNCH_REPLAY_DIR", DEFAULT_REPLAY_DIR)
+    if kind == "yfinance":
+        return YFinanceProvider()
+    if kind == "record":
+        return RecordingProvider(YFinanceProvider(), root=root)
+    if kind == "replay":
+        return ReplayProvider(
+            root=root,
+            latency=float(os.environ.get("LYNCH_REPLAY_LATENCY", 0)),
+            jitter=float(os.environ.get("LYNCH_REPLAY_JITTER", 0))
+        )
+    raise ValueError(f"Unknown market data provider: {kind!r}")
+
+
+def get_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_provider()
+        return _provider
+
+
+def set_provider(provider):
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.disk_cache import CACHE_DIR
+from utils.market_data import get_provider
+from utils.shared_cache import lease
+
+# Local OHLCV store, one memory-mapped .npy file per (interval, ticker).
+# Range switches are served by slicing the stored bars; the network is only
+# asked for bars after the last stored timestamp, or for history older than
+# anything we have. Files are replaced atomically, so every session and
+# process can read them concurrently.
+PRICE_DIR = os.path.join(CACHE_DIR, "prices")
+
+BAR_DTYPE = np.dtype([
+    ("ts", "i8"),           # bar open time, ns since epoch (UTC)
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+])
+FRAME_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+# How long stored bars count as current before an incremental append
+REFRESH_AFTER = {"1m": 60, "5m": 300, "15m": 900, "1h": 900, "1d": 3600, "1wk": 6 * 3600, "1mo": 86400}
+
+# Calendar span of each period; "Nd" periods count trading sessions instead,
+# matching what yfinance returns for them
+PERIOD_SPANS = {
+    "1mo": timedelta(days=31),
+    "3mo": timedelta(days=92),
+    "6mo": timedelta(days=183),
+    "1y": timedelta(days=366),
+    "2y": timedelta(days=731),
+    "5y": timedelta(days=1827),
+    "10y": timedelta(days=3653),
+}
+SESSION_PERIODS = {"1d": 1, "5d": 5}
+PERIOD_ORDER = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "max"]
+
+_locks = {}
+_locks_guard = threading.Lock()
+_mmaps = {}
+
+
+def _paths(ticker, interval):
+    base = os.path.join(PRICE_DIR, interval, ticker.replace("/", "_"))
+    return base + ".npy", base + ".json"
+
+
+def _lock_for(ticker, interval):
+    with _locks_guard:
+        return _locks.setdefault((ticker, interval), threading.Lock())
+
+
+def _load(ticker, interval):
+    data_path, meta_path = _paths(ticker, interval)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        mtime = os.stat(data_path).st_mtime_ns
+    except (FileNotFoundError, json.JSONDecodeError):
+        return np.empty(0, dtype=BAR_DTYPE), {}
+
+    # Reuse the mapping until the file is replaced, so sessions share pages
+    key = (data_path, mtime)
+    with _locks_guard:
+        bars = _mmaps.get(key)
+        if bars is None:
+            bars = np.load(data_path, mmap_mode="r")
+            _mmaps[key] = bars
+            for stale in [k for k in _mmaps if k[0] == data_path and k != key]:
+                del _mmaps[stale]
+    return bars, meta
+
+
+def _save(ticker, interval, bars, meta):
+    data_path, meta_path = _paths(ticker, interval)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(data_path + suffix, "wb") as f:
+        np.save(f, bars)
+    with open(meta_path + suffix, "w") as f:
+        json.dump(meta, f)
+    os.replace(data_path + suffix, data_path)
+    os.replace(meta_path + suffix, meta_path)
+
+
+def _frame_to_bars(hist):
+    if hist.empty:
+        return np.empty(0, dtype=BAR_DTYPE)
+    index = hist.index.tz_localize("UTC") if hist.index.tz is None else hist.index.tz_convert("UTC")
+    bars = np.empty(len(hist), dtype=BAR_DTYPE)
+    bars["ts"] = index.as_unit("ns").asi8
+    for field, column in FRAME_COLUMNS.items():
+        bars[field] = hist[column].to_numpy(dtype="float64") if column in hist.columns else np.nan
+    return bars
+
+
+def _merge(old, new):
+    if not len(new):
+        return np.asarray(old)
+    if not len(old):
+        merged = new
+    else:
+        # Later fetches win: the last stored bar is often still forming
+        merged = np.concatenate([np.asarray(old), new])
+    _, last = np.unique(merged["ts"][::-1], return_index=True)
+    return merged[len(merged) - 1 - last]
+
+
+def _period_start(period, last_ts):
+    if period in PERIOD_SPANS:
+        return pd.Timestamp(last_ts, tz="UTC") - PERIOD_SPANS[period]
+    return None
+
+
+def _slice(bars, period, tz):
+    if not len(bars) or period == "max":
+        return bars
+    end = pd.Timestamp(int(bars["ts"][-1]), tz="UTC")
+    if period in SESSION_PERIODS:
+        # Last N trading sessions in exchange time
+        days = pd.DatetimeIndex(bars["ts"], tz="UTC").tz_convert(tz).normalize()
+        sessions = days.unique()
+        first_day = sessions[max(0, len(sessions) - SESSION_PERIODS[period])]
+        return bars[np.asarray(days >= first_day)]
+    start = _period_start(period, end.value)
+    if start is None:
+        return bars
+    return bars[int(np.searchsorted(bars["ts"], start.value)):]
+
+
+def _to_frame(bars, tz):
+    index = pd.DatetimeIndex(np.asarray(bars["ts"]), tz="UTC").tz_convert(tz)
+    return pd.DataFrame({column: np.asarray(bars[field]) for field, column in FRAME_COLUMNS.items()}, index=index)
+
+
+def _covers(meta, period):
+    covered = meta.get("covered_period")
+    if covered not in PERIOD_ORDER or period not in PERIOD_ORDER:
+        return False
+    return PERIOD_ORDER.index(covered) >= PERIOD_ORDER.index(period)
+
+
+def _is_current(bars, meta, interval, period, max_age=None, now=None):
+    if not len(bars) or not _covers(meta, period):
+        return False
+    max_age = max_age if max_age is not None else REFRESH_AFTER.get(interval, 3600)
+    return (now or time.time()) - meta.get("fetched_at", 0) < max_age
+
+
+def is_current(ticker, interval, period, max_age=None):
+    """True if the stored bars already answer ``period`` without a fetch."""
+    bars, meta = _load(ticker, interval)
+    return _is_current(bars, meta, interval, period, max_age)
+
+
+def update(ticker, interval, period, max_age=None):
+    """Bring the stored bars for (ticker, interval) up to date for ``period``.
+
+    ``max_age`` overrides REFRESH_AFTER, e.g. so a warm-up job can refresh
+    bars before a page would find them stale.
+    """
+    with _lock_for(ticker, interval):
+        bars, meta = _load(ticker, interval)
+        if _is_current(bars, meta, interval, period, max_age):
+            return bars, meta
+        # One worker process fetches; the others wait and pick up its file
+        with lease("prices", f"{interval}/{ticker}"):
+            return _update_locked(ticker, interval, period, max_age)
+
+
+def _update_locked(ticker, interval, period, max_age):
+    # Reload: bars another worker wrote while we waited may already be current
+    bars, meta = _load(ticker, interval)
+    provider = get_provider()
+    now = time.time()
+
+    if not len(bars) or not _covers(meta, period):
+        # First request, or a longer range than we hold: one full fetch
+        hist = provider.history(ticker, period=period, interval=interval)
+        covered = period
+    elif not _is_current(bars, meta, interval, period, max_age, now):
+        # Only the bars since the last one we have
+        start = pd.Timestamp(int(bars["ts"][-1]), tz="UTC").tz_convert(meta.get("tz", "UTC"))
+        hist = provider.history(ticker, interval=interval, start=start)
+        covered = meta["covered_period"]
+    else:
+        return bars, meta
+
+    tz = str(hist.index.tz) if not hist.empty and hist.index.tz is not None else meta.get("tz", "UTC")
+    merged = _merge(bars, _frame_to_bars(hist))
+    meta = {"tz": tz, "fetched_at": now, "covered_period": covered}
+    if len(merged):
+        _save(ticker, interval, merged, meta)
+    return merged, meta
+
+
+def load_bars(ticker, interval):
+    """Stored bars and metadata for (ticker, interval), without touching the network."""
+    return _load(ticker, interval)
+
+
+def get_history(ticker, period, interval):
+    """OHLCV bars for ``period`` at ``interval``, shaped like yfinance's history()."""
+    bars, meta = update(ticker, interval, period)
+    tz = meta.get("tz", "UTC")
+    return _to_frame(_slice(bars, period, tz), tz)
+
+
+def close_matrix(tickers, period="max"):
+    """Dates x tickers frame of stored daily closes, NaN where a ticker has no bar.
+
+    Reads only what is already on disk. Rows are exchange-local calendar
+    days, so markets in different time zones line up on the same date.
+    """
+    days, cols, closes = [], [], []
+    for i, ticker in enumerate(tickers):
+        bars, meta = _load(ticker, "1d")
+        bars = _slice(bars, period, meta.get("tz", "UTC"))
+        if not len(bars):
+            continue
+        local = pd.DatetimeIndex(np.asarray(bars["ts"]), tz="UTC").tz_convert(meta.get("tz", "UTC"))
+        days.append(local.tz_localize(None).normalize().as_unit("ns").asi8)
+        cols.append(np.full(len(bars), i))
+        closes.append(np.asarray(bars["close"]))
+    if not days:
+        return pd.DataFrame(np.empty((0, len(tickers))), index=pd.DatetimeIndex([]), columns=list(tickers))
+    dates, rows = np.unique(np.concatenate(days), return_inverse=True)
+    matrix = np.full((len(dates), len(tickers)), np.nan)
+    matrix[rows, np.concatenate(cols)] = np.concatenate(closes)
+    return pd.DataFrame(matrix, index=pd.DatetimeIndex(dates), columns=list(tickers))
@@ -0,0 +1,82 @@
+import math
+import time
+
+from utils import disk_cache
+from utils.data_loader import FUNDAMENTAL_COLUMNS, fetch_bulk_stock_info
+
+# Incremental refresh: only tickers whose cached row is too old, or that
+# reported earnings since we last looked, go back to Yahoo.
+MAX_AGE = 86400                 # price-driven ratios (P/E, P/CF) drift daily
+REPORTING_WINDOW = 7 * 86400    # a report this recent forces a refetch
+
+
+def _same(old, new):
+    if old is None or new is None:
+        return old is None and new is None
+    if isinstance(old, float) and isinstance(new, float) and math.isnan(old) and math.isnan(new):
+        return True
+    return old == new
+
+
+def diff_record(old, new):
+    """Names of the frame columns whose value differs between two records."""
+    return [col for col in FUNDAMENTAL_COLUMNS if col != "symbol" and not _same(old.get(col), new.get(col))]
+
+
+def select_stale(symbols, now=None, max_age=MAX_AGE, reporting_window=REPORTING_WINDOW):
+    now = now or time.time()
+    symbols = list(symbols)
+    cached = disk_cache.read_latest(symbols)
+    state = disk_cache.read_refresh_state(symbols)
+
+    stale = []
+    for symbol in symbols:
+        hit = cached.get(symbol)
+        if hit is None:
+            stale.append(symbol)
+            continue
+        record, fetched_at = hit
+        last_fetched = max(fetched_at, state.get(symbol, (0, None))[0])
+        reported = record.get("earnings_timestamp")
+        if now - last_fetched >= max_age:
+            stale.append(symbol)
+        elif reported and now - reporting_window <= reported <= now and last_fetched < reported:
+            stale.append(symbol)
+    return stale
+
+
+def refresh_incremental(symbols, max_age=MAX_AGE, reporting_window=REPORTING_WINDOW, fetch_many=fetch_bulk_stock_info):
+    """Refetch stale tickers and upsert them into the stored snapshot.
+
+    Returns a dict with the tickers that were ``fetched``, the ones that
+    ``failed``, the fresh ``records`` and ``changes``: {symbol: [changed
+    fields]} for every ticker whose data actually moved. New tickers list
+    every field as changed.
+    """
+    now = time.time()
+    symbols = list(symbols)
+    previous = disk_cache.read_latest(symbols)
+    stale = select_stale(symbols, now=now, max_age=max_age, reporting_window=reporting_window)
+
+    fetched = fetch_many(stale) if stale else []
+    ok = [r for r in fetched if r.get("status", "ok") == "ok"]
+    disk_cache.write_records(ok, fetched_at=now)
+
+    changes = {}
+    state = []
+    for record in ok:
+        symbol = record["symbol"]
+        old = previous.get(symbol)
+        fields = diff_record(old[0], record) if old else [c for c in FUNDAMENTAL_COLUMNS if c != "symbol"]
+        if fields:
+            changes[symbol] = fields
+        state.append((symbol, now, now if fields else None, fields))
+    disk_cache.write_refresh_state(state)
+
+    return {
+        "fetched": stale,
+        "failed": [r["symbol"] for r in fetched if r.get("status", "ok") != "ok"],
+        "records": ok,
+        "changes": changes,
+    }
+
@@ -0,0 +1,98 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.lynch_scoring import DE_MAX, DIV_YIELD_MIN, PCF_MIN, PE_MAX, PEG_MAX
+
+# Screener criteria as data. Each predicate compares `column` against either a
+# constant `value` or another column `other`; missing values never pass. The
+# Lynch criteria take their cutoffs from the scorer.
+SCREENER_FILTERS = OrderedDict([
+    ("peg", {"label": f"PEG Ratio < {PEG_MAX:g}", "column": "peg_ratio", "op": "<", "value": PEG_MAX}),
+    ("pe", {"label": f"P/E Ratio < {PE_MAX:g}", "column": "pe_ratio", "op": "<", "value": PE_MAX}),
+    ("de", {"label": f"Debt/Equity < {DE_MAX:g}", "column": "de_ratio", "op": "<", "value": DE_MAX}),
+    ("cash", {"label": "Cash > Debt", "column": "cash", "op": ">", "other": "debt"}),
+    ("div", {"label": f"Dividend Yield > {DIV_YIELD_MIN:.0%}", "column": "div_yield", "op": ">",
+             "value": DIV_YIELD_MIN}),
+    ("pcf", {"label": f"Price to Cash Flow > {PCF_MIN:g}", "column": "price_to_cashflow", "op": ">",
+             "value": PCF_MIN}),
+    ("gm", {"label": "Gross Margin > 20%", "column": "gross_margin", "op": ">", "value": 0.20}),
+    ("om", {"label": "Operating Margin > 10%", "column": "operating_margin", "op": ">", "value": 0.10}),
+    ("roe", {"label": "ROE > 10%", "column": "roe", "op": ">", "value": 0.10}),
+    ("roa", {"label": "ROA > 5%", "column": "roa", "op": ">", "value": 0.05}),
+])
+
+_OPS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+}
+
+# Packed masks keyed by (frame version, filter name). Bounded so a long-lived
+# server doesn't keep masks for every snapshot it has ever seen.
+MASK_CACHE_SIZE = 512
+_mask_cache = OrderedDict()
+_mask_lock = threading.Lock()
+
+
+def _column(df, name):
+    return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype="float64")
+
+
+def compile_predicate(df, predicate):
+    """Evaluate one declarative predicate into a boolean NumPy mask."""
+    left = _column(df, predicate["column"])
+    right = _column(df, predicate["other"]) if "other" in predicate else predicate["value"]
+    with np.errstate(invalid="ignore"):
+        return _OPS[predicate["op"]](left, right)
+
+
+def frame_version(df):
+    """Identify a frame's contents cheaply.
+
+    Frames from get_bulk_stock_data carry a snapshot version in ``attrs``;
+    combined with the row index it also tells filtered subsets apart. Other
+    frames fall back to hashing their contents.
+    """
+    index_digest = hashlib.sha1(pd.util.hash_pandas_object(df.index).to_numpy().tobytes()).hexdigest()
+    version = df.attrs.get("snapshot_version")
+    if version is None:
+        version = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+    return f"{version}:{index_digest}"
+
+
+def _packed_mask(df, version, name):
+    key = (version, name)
+    with _mask_lock:
+        bits = _mask_cache.get(key)
+        if bits is not None:
+            _mask_cache.move_to_end(key)
+            return bits
+
+    bits = np.packbits(compile_predicate(df, SCREENER_FILTERS[name]))
+    with _mask_lock:
+        _mask_cache[key] = bits
+        while len(_mask_cache) > MASK_CACHE_SIZE:
+            _mask_cache.popitem(last=False)
+    return bits
+
+
+def filter_mask(df, active):
+    """Boolean mask of rows passing every filter named in ``active``.
+
+    Each filter is computed once per frame version and kept as a bitset, so
+    toggling a checkbox only ANDs cached bitsets together.
+    """
+    active = list(active)
+    if not active:
+        return np.ones(len(df), dtype=bool)
+
+    version = frame_version(df)
+    combined = _packed_mask(df, version, active[0])
+    for name in active[1:]:
+        combined = combined & _packed_mask(df, version, name)
+    return np.unpackbits(combined, count=len(df)).astype(bool)
@@ -0,0 +1,187 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from utils.lynch_scoring import DE_MAX, DIV_YIELD_MIN, PCF_MIN, PE_MAX, PEG_MAX, score_lynch_frame
+
+# Threshold sensitivity of the Lynch score: every combination of the cutoffs
+# below is scored and ranked, and each ticker's score and rank are summarised
+# across all of them. Each metric is sorted once; a cutoff is then a
+# searchsorted position in that order, so a combination costs a gather, not
+# a rescan of the data. Cash > Debt has no threshold and always counts.
+SENSITIVITY_GRID = [
+    {"column": "peg_ratio", "op": "<", "values": [0.5, 0.75, PEG_MAX, 1.5, 2]},
+    {"column": "pe_ratio", "op": "<", "values": [10, 15, PE_MAX, 25, 30]},
+    {"column": "de_ratio", "op": "<", "values": [0.25, DE_MAX, 0.75, 1, 1.5]},
+    {"column": "div_yield", "op": ">", "values": [0.01, 0.015, DIV_YIELD_MIN, 0.03, 0.04]},
+    {"column": "price_to_cashflow", "op": ">", "values": [2, 3, PCF_MIN, 8, 10]},
+]
+TOP_N = 10
+TICKER_COLUMNS = [
+    "score", "rank", "score_mean", "score_std", "score_min", "score_max",
+    "rank_mean", "rank_std", "rank_best", "rank_worst", "top_share",
+]
+CHUNK = 512                     # combinations scored at a time; bounds memory
+
+
+def _numeric(df, column):
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64")
+
+
+def _passes(values, op, cutoffs):
+    """tickers x cutoffs boolean: does each value pass each cutoff."""
+    order = np.argsort(values, kind="stable")           # NaN sorts last
+    position = np.empty(len(values), dtype=np.intp)
+    position[order] = np.arange(len(values))
+    n_valid = int((~np.isnan(values)).sum())
+    ordered = values[order[:n_valid]]
+    if op == "<":
+        cuts = np.searchsorted(ordered, cutoffs, side="left")
+        return position[:, None] < cuts[None, :]
+    cuts = np.searchsorted(ordered, cutoffs, side="right")
+    return (position[:, None] >= cuts[None, :]) & (position[:, None] < n_valid)
+
+
+def _competition_rank(scores):
+    # Rank 1 is the highest score; ties share the better rank. ``scores`` is
+    # tickers x combinations of small non-negative integers.
+    counts = np.stack([(scores == s).sum(axis=0) for s in range(int(scores.max()) + 1)])
+    higher = counts[::-1].cumsum(axis=0)[::-1] - counts
+    return np.take_along_axis(higher, scores, axis=0) + 1
+
+
+def _combo_frame(grid):
+    cutoffs = np.array(list(itertools.product(*[spec["values"] for spec in grid])), dtype="float64")
+    return pd.DataFrame(cutoffs, columns=[spec["column"] for spec in grid])
+
+
+def threshold_sensitivity(df, grid=SENSITIVITY_GRID, top_n=TOP_N):
+    """Score and rank every row of ``df`` under every combination of cutoffs in ``grid``.
+
+    Returns a dict with ``tickers`` (per symbol: score and rank at the
+    current cutoffs, mean/std/min/max score and rank across combinations
+    and ``top_share``, the share of combinations that rank it in the top
+    ``top_n``) and ``combos`` (the cutoffs of each combination, its mean
+    score and ``top_overlap`` with the current top ``top_n``).
+    """
+    grid = [dict(spec, values=sorted(spec["values"])) for spec in grid]
+    if not len(df):
+        # Nothing to rank (e.g. every ticker failed to load)
+        combos = _combo_frame(grid)
+        combos["mean_score"] = np.nan
+        combos["top_overlap"] = 0.0
+        return {"tickers": pd.DataFrame(columns=TICKER_COLUMNS, index=pd.Index([], name="symbol")),
+                "combos": combos}
+
+    passes = [_passes(_numeric(df, spec["column"]), spec["op"], np.asarray(spec["values"], dtype="float64"))
+              for spec in grid]
+    with np.errstate(invalid="ignore"):
+        fixed = (_numeric(df, "cash") > _numeric(df, "debt")).astype(np.int8)
+
+    baseline = score_lynch_frame(df)["score"].to_numpy()
+    base_rank = _competition_rank(baseline[:, None])[:, 0]
+    base_top = base_rank <= top_n
+
+    shape = [len(spec["values"]) for spec in grid]
+    n_combos = int(np.prod(shape))
+    n = len(df)
+    score_sum = np.zeros(n)
+    score_sq = np.zeros(n)
+    rank_sum = np.zeros(n)
+    rank_sq = np.zeros(n)
+    score_min = np.full(n, np.iinfo(np.int8).max, dtype=np.int8)
+    score_max = np.zeros(n, dtype=np.int8)
+    rank_best = np.full(n, n + 1)
+    rank_worst = np.zeros(n, dtype=np.int64)
+    top_count = np.zeros(n)
+    mean_score = np.empty(n_combos)
+    top_overlap = np.empty(n_combos)
+
+    for start in range(0, n_combos, CHUNK):
+        combos = np.arange(start, min(start + CHUNK, n_combos))
+        levels = np.unravel_index(combos, shape)
+        scores = np.repeat(fixed[:, None], len(combos), axis=1)
+        for passed, level in zip(passes, levels):
+            scores += passed[:, level]
+        ranks = _competition_rank(scores)
+        top = ranks <= top_n
+
+        score_sum += scores.sum(axis=1)
+        score_sq += (scores.astype(np.int64) ** 2).sum(axis=1)
+        rank_sum += ranks.sum(axis=1)
+        rank_sq += (ranks.astype(np.float64) ** 2).sum(axis=1)
+        np.minimum(score_min, scores.min(axis=1), out=score_min)
+        np.maximum(score_max, scores.max(axis=1), out=score_max)
+        np.minimum(rank_best, ranks.min(axis=1), out=rank_best)
+        np.maximum(rank_worst, ranks.max(axis=1), out=rank_worst)
+        top_count += top.sum(axis=1)
+        mean_score[combos] = scores.mean(axis=0)
+        top_overlap[combos] = (top & base_top[:, None]).sum(axis=0) / max(base_top.sum(), 1)
+
+    score_mean = score_sum / n_combos
+    rank_mean = rank_sum / n_combos
+    tickers = pd.DataFrame({
+        "score": baseline,
+        "rank": base_rank,
+        "score_mean": score_mean,
+        "score_std": np.sqrt(np.maximum(score_sq / n_combos - score_mean ** 2, 0)),
+        "score_min": score_min,
+        "score_max": score_max,
+        "rank_mean": rank_mean,
+        "rank_std": np.sqrt(np.maximum(rank_sq / n_combos - rank_mean ** 2, 0)),
+        "rank_best": rank_best,
+        "rank_worst": rank_worst,
+        "top_share": top_count / n_combos,
+    }, index=pd.Index(df["symbol"].astype(str).to_numpy(), name="symbol"))
+
+    combos = _combo_frame(grid)
+    combos["mean_score"] = mean_score
+    combos["top_overlap"] = top_overlap
+    return {"tickers": tickers, "combos": combos}
+
+
+def _benchmark(n=3000, levels=(5, 7)):
+    import time
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "symbol": [f"T{i}" for i in range(n)],
+        "peg_ratio": rng.uniform(0, 3, n),
+        "pe_ratio": rng.uniform(5, 40, n),
+        "de_ratio": rng.uniform(0, 2, n),
+        "cash": rng.uniform(0, 1e10, n),
+        "debt": rng.uniform(0, 1e10, n),
+        "div_yield": rng.uniform(0, 0.05, n),
+        "price_to_cashflow": rng.uniform(0, 30, n),
+    })
+    df = df.mask(rng.random(df.shape) < 0.1).assign(symbol=df["symbol"])
+
+    for per_metric in levels:
+        grid = [dict(spec, values=np.quantile(df[spec["column"]].dropna(), np.linspace(0.1, 0.9, per_metric)))
+                for spec in SENSITIVITY_GRID]
+        start = time.perf_counter()
+        result = threshold_sensitivity(df, grid)
+        elapsed = time.perf_counter() - start
+
+        # Rescanning every metric for a sample of combinations, for comparison
+        sample = result["combos"].sample(50, random_state=0)
+        start = time.perf_counter()
+        for _, cutoffs in sample.iterrows():
+            with np.errstate(invalid="ignore"):
+                score = (df["cash"] > df["debt"]).to_numpy(dtype=np.int8)
+                for spec in grid:
+                    values = df[spec["column"]].to_numpy()
+                    cut = cutoffs[spec["column"]]
+                    score = score + (values < cut if spec["op"] == "<" else values > cut)
+            pd.Series(score).rank(method="min", ascending=False)
+        rescan = (time.perf_counter() - start) / len(sample) * len(result["combos"])
+
+        print(f"{n} tickers x {len(result['combos'])} combinations: sorted cuts {elapsed:6.2f} s, "
+              f"rescanning (extrapolated) {rescan:6.2f} s")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,166 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Key/value cache and single-flight leases shared by every Streamlit worker
+# on the host. st.cache_data is per process; anything that costs a network
+# round trip goes through here so only one worker pays for it. Values are
+# pickled into one SQLite file in WAL mode: writes are atomic upserts and
+# readers never block the writer.
+CACHE_DIR = os.environ.get(
+    "LYNCH_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+)
+SHARED_PATH = os.path.join(CACHE_DIR, "shared.sqlite3")
+
+LEASE_TTL = 120             # a crashed holder's lease frees itself after this
+POLL_INTERVAL = 0.1         # how often waiters check a busy lease
+PURGE_INTERVAL = 3600
+
+_MISSING = object()
+_lock = threading.Lock()
+_last_purge = 0.0
+
+
+@contextmanager
+def _connect():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(SHARED_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS entries ("
+        " namespace TEXT NOT NULL,"
+        " key TEXT NOT NULL,"
+        " stored_at REAL NOT NULL,"
+        " expires_at REAL NOT NULL,"
+        " value BLOB NOT NULL,"
+        " PRIMARY KEY (namespace, key))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS leases ("
+        " namespace TEXT NOT NULL,"
+        " key TEXT NOT NULL,"
+        " owner TEXT NOT NULL,"
+        " expires_at REAL NOT NULL,"
+        " PRIMARY KEY (namespace, key))"
+    )
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def get(namespace, key, default=None, max_age=None):
+    """The stored value, or ``default`` if missing, expired or older than ``max_age``."""
+    now = time.time()
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT stored_at, value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, now)
+        ).fetchone()
+    if row is None or (max_age is not None and now - row[0] >= max_age):
+        return default
+    return pickle.loads(row[1])
+
+
+def put(namespace, key, value, ttl):
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, stored_at, expires_at, value)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, now, now + ttl, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        )
+    _maybe_purge()
+
+
+def scan(namespace, prefix=""):
+    """{key: value} for every live entry in ``namespace`` whose key starts with ``prefix``."""
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT key, value FROM entries WHERE namespace = ? AND key >= ? AND key < ? AND expires_at > ?",
+            (namespace, prefix, prefix + "\uffff", time.time())
+        ).fetchall()
+    return {key: pickle.loads(value) for key, value in rows}
+
+
+def try_lease(namespace, key, ttl=LEASE_TTL):
+    """Take the lease on (namespace, key) if it is free; returns a token or None."""
+    token = uuid.uuid4().hex
+    now = time.time()
+    with _connect() as conn:
+        # One statement: insert, or take over an expired lease, atomically
+        cursor = conn.execute(
+            "INSERT INTO leases (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(namespace, key) DO UPDATE SET"
+            " owner = excluded.owner, expires_at = excluded.expires_at"
+            " WHERE leases.expires_at <= ?",
+            (namespace, key, token, now + ttl, now)
+        )
+        return token if cursor.rowcount else None
+
+
+def release(namespace, key, token):
+    with _connect() as conn:
+        conn.execute(
+            "DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?",
+            (namespace, key, token)
+        )
+
+
+@contextmanager
+def lease(namespace, key, ttl=LEASE_TTL, wait=True):
+    """Hold the lease on (namespace, key) for the ``with`` block.
+
+    With ``wait`` the block waits until the lease is free; without it the
+    block gets ``None`` when another worker holds the lease.
+    """
+    token = try_lease(namespace, key, ttl)
+    while token is None and wait:
+        time.sleep(POLL_INTERVAL)
+        token = try_lease(namespace, key, ttl)
+    try:
+        yield token
+    finally:
+        if token is not None:
+            release(namespace, key, token)
+
+
+def get_or_compute(namespace, key, compute, ttl, max_age=None, lease_ttl=LEASE_TTL):
+    """Cached value for (namespace, key), computed by one worker at a time.
+
+    On a miss the caller takes the key's lease; callers that find it taken
+    wait, then read what the holder stored instead of computing it again.
+    """
+    value = get(namespace, key, _MISSING, max_age)
+    if value is not _MISSING:
+        return value
+    with lease(namespace, key, lease_ttl):
+        # Whoever held the lease before us has probably filled the key
+        value = get(namespace, key, _MISSING, max_age)
+        if value is _MISSING:
+            value = compute()
+            put(namespace, key, value, ttl)
+    return value
+
+
+def purge():
+    now = time.time()
+    with _connect() as conn:
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+
+
+def _maybe_purge():
+    global _last_purge
+    now = time.monotonic()
+    with _lock:
+        if _last_purge and now - _last_purge < PURGE_INTERVAL:
+            return
+        _last_purge = now
+    purge()
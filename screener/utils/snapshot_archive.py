@@ -0,0 +1,337 @@
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.data_loader import FUNDAMENTAL_SCHEMA, table_to_frame
+from utils.shared_cache import CACHE_DIR, lease
+from utils.universes import DEFAULT_UNIVERSE
+
+# Append-only history of the fundamentals table, one dated snapshot per
+# refresh. A keyframe stores the whole table; the snapshots after it only
+# store the cells that changed (symbol, field, new value), so a day where
+# only prices moved costs one row per ticker. Files are Parquet sorted by
+# symbol with small row groups, so a ticker range reads only the row groups
+# that hold it, and an as-of read replays at most KEYFRAME_EVERY files.
+ARCHIVE_DIR = os.environ.get("LYNCH_ARCHIVE_DIR", os.path.join(CACHE_DIR, "archive"))
+KEYFRAME_EVERY = 30             # snapshots per keyframe, the keyframe included
+KEYFRAME_SHARE = 0.5            # write a keyframe anyway if this share of cells changed
+ROW_GROUP_ROWS = 256
+APPEND_LEASE_TTL = 600
+
+_lock = threading.Lock()
+_latest = {}                    # universe -> (path, state) of the newest snapshot appended here
+
+_REMOVED = "__removed__"        # delta field marking a ticker that left the universe
+_FILE_RE = re.compile(r"^(\d{8}T\d{6})\.(key|delta)\.parquet$")
+_TEXT_FIELDS = [f.name for f in FUNDAMENTAL_SCHEMA
+                if f.name != "symbol" and (pa.types.is_dictionary(f.type) or pa.types.is_string(f.type))]
+_NUMERIC_FIELDS = [f.name for f in FUNDAMENTAL_SCHEMA if f.name != "symbol" and f.name not in _TEXT_FIELDS]
+_FLOAT_FIELDS = [f.name for f in FUNDAMENTAL_SCHEMA if pa.types.is_floating(f.type)]
+
+# Keyframes store labels as plain strings; Parquet dictionary-encodes them itself
+KEYFRAME_SCHEMA = pa.schema([
+    pa.field(f.name, pa.string()) if pa.types.is_dictionary(f.type) else f for f in FUNDAMENTAL_SCHEMA
+])
+DELTA_SCHEMA = pa.schema([
+    pa.field("symbol", pa.string()),
+    pa.field("field", pa.string()),
+    pa.field("value", pa.float64()),
+    pa.field("text", pa.string()),
+])
+
+
+def _archive_dir(universe):
+    return os.path.join(ARCHIVE_DIR, universe)
+
+
+def _entries(universe):
+    """[(as_of, kind, path)] of every archived snapshot, oldest first."""
+    try:
+        names = os.listdir(_archive_dir(universe))
+    except FileNotFoundError:
+        return []
+    entries = []
+    for name in sorted(names):
+        match = _FILE_RE.match(name)
+        if match:
+            as_of = pd.Timestamp(pd.to_datetime(match.group(1), format="%Y%m%dT%H%M%S"))
+            entries.append((as_of, match.group(2), os.path.join(_archive_dir(universe), name)))
+    return entries
+
+
+def snapshot_dates(universe=DEFAULT_UNIVERSE):
+    return [as_of for as_of, _, _ in _entries(universe)]
+
+
+def _read(path, symbol_range):
+    filters = []
+    if symbol_range is not None:
+        first, last = symbol_range
+        if first is not None:
+            filters.append(("symbol", ">=", first))
+        if last is not None:
+            filters.append(("symbol", "<=", last))
+    return pq.read_table(path, filters=filters or None)
+
+
+def _write(path, table, dictionary_columns, float_columns):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pq.write_table(table, tmp, compression="zstd", row_group_size=ROW_GROUP_ROWS,
+                   use_dictionary=dictionary_columns, use_byte_stream_split=float_columns)
+    os.replace(tmp, path)
+
+
+def _texts(values):
+    # Labels as Python strings, with None (never NaN) for missing
+    return np.array([value if isinstance(value, str) else None for value in values], dtype=object)
+
+
+def _state(table):
+    # Working form of a snapshot: one row per symbol, numbers as float64,
+    # labels as Python strings or None
+    columns = {}
+    names = set(table.column_names)
+    for name in _NUMERIC_FIELDS:
+        columns[name] = (table.column(name).to_numpy(zero_copy_only=False).astype("float64")
+                         if name in names else np.full(len(table), np.nan))
+    for name in _TEXT_FIELDS:
+        columns[name] = (np.array(table.column(name).cast(pa.string()).to_pylist(), dtype=object)
+                         if name in names else np.full(len(table), None, dtype=object))
+    symbols = pd.Index(table.column("symbol").cast(pa.string()).to_pylist(), name="symbol")
+    return pd.DataFrame(columns, index=symbols).sort_index()
+
+
+def _state_table(state, schema):
+    arrays = [pa.array(state.index.to_numpy(dtype=object), pa.string())]
+    for field in list(schema)[1:]:
+        values = state[field.name].to_numpy()
+        if field.name in _TEXT_FIELDS:
+            array = pa.array(_texts(values), pa.string())
+            arrays.append(array.dictionary_encode().cast(field.type) if pa.types.is_dictionary(field.type) else array)
+        elif pa.types.is_integer(field.type):
+            arrays.append(pa.array(np.nan_to_num(values.astype("float64")).astype(field.type.to_pandas_dtype())))
+        else:
+            arrays.append(pa.array(values.astype(field.type.to_pandas_dtype())))
+    if pa.types.is_dictionary(schema.field("symbol").type):
+        arrays[0] = arrays[0].dictionary_encode().cast(schema.field("symbol").type)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _diff(old, new):
+    """Delta table turning ``old`` into ``new``: changed cells, new rows and removed symbols."""
+    previous = old.reindex(new.index)
+    added = ~new.index.isin(old.index)
+    symbols, fields, values, texts = [], [], [], []
+    for name in _NUMERIC_FIELDS:
+        a, b = previous[name].to_numpy(dtype="float64"), new[name].to_numpy(dtype="float64")
+        changed = added | ~((a == b) | (np.isnan(a) & np.isnan(b)))
+        symbols.append(new.index.to_numpy()[changed])
+        fields.append(np.full(changed.sum(), name, dtype=object))
+        values.append(b[changed])
+        texts.append(np.full(changed.sum(), None, dtype=object))
+    for name in _TEXT_FIELDS:
+        a, b = _texts(previous[name]), _texts(new[name])
+        changed = added | (a != b)
+        symbols.append(new.index.to_numpy()[changed])
+        fields.append(np.full(changed.sum(), name, dtype=object))
+        values.append(np.full(changed.sum(), np.nan))
+        texts.append(b[changed])
+    removed = old.index.difference(new.index).to_numpy()
+    symbols.append(removed)
+    fields.append(np.full(len(removed), _REMOVED, dtype=object))
+    values.append(np.full(len(removed), np.nan))
+    texts.append(np.full(len(removed), None, dtype=object))
+
+    delta = pd.DataFrame({
+        "symbol": np.concatenate(symbols).astype(object), "field": np.concatenate(fields),
+        "value": np.concatenate(values), "text": np.concatenate(texts),
+    }).sort_values(["symbol", "field"], kind="stable")
+    return pa.Table.from_pandas(delta, schema=DELTA_SCHEMA, preserve_index=False)
+
+
+def _apply(state, delta):
+    changes = delta.to_pandas()
+    state = state.copy()
+    removed = changes["field"] == _REMOVED
+    if removed.any():
+        state = state.drop(index=changes.loc[removed, "symbol"], errors="ignore")
+        changes = changes[~removed]
+    added = pd.Index(changes["symbol"].unique()).difference(state.index)
+    if len(added):
+        empty = pd.DataFrame({name: np.full(len(added), np.nan) for name in _NUMERIC_FIELDS}
+                             | {name: np.full(len(added), None, dtype=object) for name in _TEXT_FIELDS},
+                             index=added.rename("symbol"))
+        state = pd.concat([state, empty]).sort_index()
+    rows = state.index.get_indexer(changes["symbol"])
+    for name, positions in changes.groupby("field").indices.items():
+        if name not in state.columns:
+            continue
+        column = state[name].to_numpy(copy=True)
+        if name in _TEXT_FIELDS:
+            column[rows[positions]] = _texts(changes["text"].to_numpy()[positions])
+        else:
+            column[rows[positions]] = changes["value"].to_numpy()[positions]
+        state[name] = column
+    return state
+
+
+def _frame(state, as_of):
+    df = table_to_frame(_state_table(state, FUNDAMENTAL_SCHEMA))
+    df.attrs["as_of"] = as_of.isoformat()
+    return df
+
+
+def _replay(entries, symbol_range):
+    """Yield (as_of, state) for ``entries``, starting from the keyframe before the first."""
+    state = None
+    for as_of, kind, path in entries:
+        table = _read(path, symbol_range)
+        state = _state(table) if kind == "key" else _apply(state, table)
+        yield as_of, state
+
+
+def _window(entries, since, until):
+    # Entries up to ``until``, starting at the last keyframe at or before
+    # ``since`` (or at the first one)
+    if until is not None:
+        entries = [e for e in entries if e[0] <= pd.Timestamp(until)]
+    start = 0
+    if since is not None:
+        for i, (as_of, kind, _) in enumerate(entries):
+            if kind == "key" and as_of <= pd.Timestamp(since):
+                start = i
+    return entries[start:]
+
+
+def read_snapshot(universe=DEFAULT_UNIVERSE, as_of=None, symbol_range=None):
+    """The fundamentals frame as it was archived at ``as_of`` (latest by default).
+
+    ``symbol_range`` is an inclusive (first, last) pair of symbols; either
+    end may be None. Returns None when nothing was archived by ``as_of``.
+    """
+    entries = _entries(universe)
+    if as_of is None and entries:
+        as_of = entries[-1][0]
+    entries = _window(entries, as_of, as_of)
+    if not entries:
+        return None
+    for when, state in _replay(entries, symbol_range):
+        pass
+    return _frame(state, when)
+
+
+def iter_snapshots(universe=DEFAULT_UNIVERSE, since=None, until=None, symbol_range=None):
+    """Yield (as_of, fundamentals frame) for every snapshot between ``since`` and ``until``.
+
+    Snapshots are rebuilt incrementally, one delta at a time, so walking the
+    whole history reads every file once. The pairs feed backtest.score_panel.
+    """
+    for as_of, state in _replay(_window(_entries(universe), since, until), symbol_range):
+        if since is None or as_of >= pd.Timestamp(since):
+            yield as_of, _frame(state, as_of)
+
+
+def field_history(field, universe=DEFAULT_UNIVERSE, since=None, until=None, symbol_range=None):
+    """Dates x symbols frame of one fundamentals field across the archive."""
+    rows = {}
+    for as_of, state in _replay(_window(_entries(universe), since, until), symbol_range):
+        if since is None or as_of >= pd.Timestamp(since):
+            rows[as_of] = state[field]
+    return pd.DataFrame(rows).T
+
+
+def append(table, universe=DEFAULT_UNIVERSE, as_of=None):
+    """Archive ``table`` (a fundamentals table) as the snapshot of ``as_of`` (now by default).
+
+    Snapshots are append-only: ``as_of`` must be later than the newest one.
+    Returns the path written.
+    """
+    as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.now("UTC").tz_localize(None)
+    as_of = as_of.floor("s")
+    new = _state(table)
+    with lease("archive", universe, APPEND_LEASE_TTL):
+        entries = _entries(universe)
+        if entries and as_of <= entries[-1][0]:
+            raise ValueError(f"Archive for {universe} already has a snapshot at or after {as_of}")
+        name = f"{as_of:%Y%m%dT%H%M%S}"
+        since_keyframe = len(entries) - max((i for i, e in enumerate(entries) if e[1] == "key"), default=len(entries))
+        path = os.path.join(_archive_dir(universe), f"{name}.key.parquet")
+        if entries and since_keyframe < KEYFRAME_EVERY:
+            delta = _diff(_latest_state(universe, entries), new)
+            if len(delta) <= KEYFRAME_SHARE * new.size:
+                path = os.path.join(_archive_dir(universe), f"{name}.delta.parquet")
+                _write(path, delta, ["symbol", "field", "text"], ["value"])
+        if path.endswith(".key.parquet"):
+            _write(path, _state_table(new, KEYFRAME_SCHEMA), ["symbol"] + _TEXT_FIELDS, _FLOAT_FIELDS)
+        with _lock:
+            _latest[universe] = (path, new)
+        return path
+
+
+def _latest_state(universe, entries):
+    # The previous append from this process saves replaying the tail again
+    with _lock:
+        path, state = _latest.get(universe, (None, None))
+    if path == entries[-1][2]:
+        return state
+    for _, state in _replay(_window(entries, entries[-1][0], None), None):
+        pass
+    return state
+
+
+def _benchmark(n=3000, days=365):
+    import tempfile
+    import time
+
+    global ARCHIVE_DIR
+    rng = np.random.default_rng(0)
+    symbols = np.array(sorted(f"T{i:04d}" for i in range(n)), dtype=object)
+    state = pd.DataFrame({name: rng.lognormal(0, 1, n) for name in _NUMERIC_FIELDS}
+                         | {name: np.full(n, None, dtype=object) for name in _TEXT_FIELDS},
+                         index=pd.Index(symbols, name="symbol"))
+    state["name"] = symbols
+    state["status"] = "ok"
+    for name in ["checklist_mask", "checklist_passed", "checklist_score"]:
+        state[name] = rng.integers(0, 8, n).astype("float64")
+
+    with tempfile.TemporaryDirectory() as root:
+        ARCHIVE_DIR = root
+        full_bytes = 0
+        start = time.perf_counter()
+        for day in range(days):
+            # Prices move every day; a few dozen tickers report new fundamentals
+            state["current_price"] = (state["current_price"] * rng.normal(1, 0.01, n)).astype("float32")
+            reporting = rng.choice(n, 40, replace=False)
+            for name in ["pe_ratio", "peg_ratio", "cash", "debt", "roe"]:
+                state.iloc[reporting, state.columns.get_loc(name)] = rng.lognormal(0, 1, len(reporting))
+            table = _state_table(state, FUNDAMENTAL_SCHEMA)
+            append(table, "bench", pd.Timestamp("2025-01-01") + pd.Timedelta(days=day))
+            if day == 0:
+                sink = pa.BufferOutputStream()
+                pq.write_table(table, sink, compression="zstd")
+                full_bytes = sink.getvalue().size
+        elapsed = time.perf_counter() - start
+        archived = sum(os.path.getsize(path) for _, _, path in _entries("bench"))
+
+        print(f"{days} daily snapshots of {n} tickers (appended in {elapsed:.1f} s)")
+        print(f"  archive {archived / 2**20:8.1f} MB; one full Parquet file per day would be "
+              f"{full_bytes * days / 2**20:.1f} MB")
+        for label, run in [
+            ("as-of read, all tickers", lambda: read_snapshot("bench", "2025-06-15")),
+            ("as-of read, T1000-T1099", lambda: read_snapshot("bench", "2025-06-15", ("T1000", "T1099"))),
+            ("pe_ratio history, 100 tickers", lambda: field_history("pe_ratio", "bench",
+                                                                    symbol_range=("T1000", "T1099"))),
+        ]:
+            start = time.perf_counter()
+            result = run()
+            print(f"  {label:30} {(time.perf_counter() - start) * 1e3:8.0f} ms  {result.shape}")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import pyarrow as pa
+
+from utils.shared_cache import CACHE_DIR
+
+# Published fundamentals snapshots: one immutable Arrow IPC file per
+# (dataset, version), memory-mapped by every session and worker process.
+# The OS page cache holds one copy of the data no matter how many readers
+# there are; a new version is a new file, and CURRENT points at it.
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+KEEP_VERSIONS = 3       # older files are removed; open mappings stay valid
+# Every distinct ticker list is its own dataset, so whole datasets are pruned
+# too: the least recently used beyond MAX_DATASETS, and any unused this long
+MAX_DATASETS = 32
+DATASET_MAX_AGE = 7 * 86400
+PRUNE_INTERVAL = 3600   # prune datasets at most once an hour per process
+
+_lock = threading.Lock()
+_tables = {}
+_last_prune = 0.0
+
+
+def dataset_name(tickers):
+    # Row order follows the ticker list, so the order is part of the name
+    return hashlib.sha1(",".join(tickers).encode()).hexdigest()[:16]
+
+
+def _dataset_dir(dataset):
+    return os.path.join(SNAPSHOT_DIR, dataset)
+
+
+def _version_path(dataset, version):
+    return os.path.join(_dataset_dir(dataset), f"{version}.arrow")
+
+
+def current_version(dataset):
+    try:
+        with open(os.path.join(_dataset_dir(dataset), "CURRENT")) as f:
+            return json.load(f)["version"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+
+
+def publish(dataset, table, version):
+    """Write ``table`` as ``version`` of ``dataset`` (once) and make it current."""
+    directory = _dataset_dir(dataset)
+    path = _version_path(dataset, version)
+    os.makedirs(directory, exist_ok=True)
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    if not os.path.exists(path):
+        with pa.OSFile(path + suffix, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(path + suffix, path)
+
+    with open(os.path.join(directory, "CURRENT") + suffix, "w") as f:
+        json.dump({"version": version}, f)
+    os.replace(os.path.join(directory, "CURRENT") + suffix, os.path.join(directory, "CURRENT"))
+    _prune(dataset, keep=version)
+    _maybe_prune_datasets(keep=dataset)
+
+
+def _prune(dataset, keep):
+    directory = _dataset_dir(dataset)
+    files = [f for f in os.listdir(directory) if f.endswith(".arrow")]
+    files.sort(key=lambda f: os.path.getmtime(os.path.join(directory, f)), reverse=True)
+    for name in files[KEEP_VERSIONS:]:
+        if name != f"{keep}.arrow":
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def _touch(dataset):
+    # The directory's mtime records when the dataset was last used
+    try:
+        os.utime(_dataset_dir(dataset))
+    except FileNotFoundError:
+        pass
+
+
+def prune_datasets(keep=None, max_datasets=MAX_DATASETS, max_age=DATASET_MAX_AGE):
+    """Remove datasets unused for ``max_age`` seconds or beyond the ``max_datasets`` most recent."""
+    try:
+        names = [n for n in os.listdir(SNAPSHOT_DIR) if os.path.isdir(os.path.join(SNAPSHOT_DIR, n))]
+    except FileNotFoundError:
+        return
+    used = {}
+    for name in names:
+        try:
+            used[name] = os.path.getmtime(os.path.join(SNAPSHOT_DIR, name))
+        except FileNotFoundError:
+            pass
+    now = time.time()
+    ranked = sorted(used, key=used.get, reverse=True)
+    for rank, name in enumerate(ranked):
+        if name != keep and (rank >= max_datasets or now - used[name] > max_age):
+            # Readers that already mapped a file keep it until they let go
+            shutil.rmtree(os.path.join(SNAPSHOT_DIR, name), ignore_errors=True)
+
+
+def _maybe_prune_datasets(keep):
+    global _last_prune
+    now = time.monotonic()
+    with _lock:
+        if _last_prune and now - _last_prune < PRUNE_INTERVAL:
+            return
+        _last_prune = now
+    prune_datasets(keep=keep)
+
+
+def open_snapshot(dataset, version=None):
+    """The snapshot as a read-only Arrow table backed by a memory map, or None."""
+    version = version or current_version(dataset)
+    if version is None:
+        return None
+    path = _version_path(dataset, version)
+    with _lock:
+        table = _tables.get(path)
+        if table is None:
+            try:
+                source = pa.memory_map(path, "r")
+            except FileNotFoundError:
+                return None
+            table = pa.ipc.open_file(source).read_all()
+            _tables[path] = table
+            # Forget mappings of versions that are no longer current
+            for stale in [p for p in _tables if os.path.dirname(p) == os.path.dirname(path) and p != path]:
+                del _tables[stale]
+    _touch(dataset)
+    return table
@@ -0,0 +1,220 @@
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+
+import numpy as np
+
+from utils import disk_cache
+from utils.data_loader import fetch_bulk_stock_info
+from utils.disk_cache import CACHE_DIR
+
+# Persisted symbol metadata (name, sector, industry, exchange, aliases) with
+# prefix and fuzzy search. Entries come from the fundamentals records we
+# already cache, so labelling tickers never costs an .info call per symbol.
+INDEX_PATH = os.path.join(CACHE_DIR, "symbol_index.json")
+# Symbols whose fetch failed keep a placeholder entry (labelled with the
+# ticker) for this long, so they aren't refetched on every lookup
+FAILED_RETRY_AFTER = 86400
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _normalize(text):
+    return re.sub(r"[^a-z0-9]+", " ", str(text).lower()).strip()
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def entry_from_record(record):
+    symbol = record["symbol"]
+    aliases = []
+    long_name = record.get("long_name")
+    if long_name and long_name != record.get("name"):
+        aliases.append(long_name)
+    if "-" in symbol:
+        # BRK-B is also typed as BRK.B or BRKB
+        aliases += [symbol.replace("-", "."), symbol.replace("-", "")]
+    return {
+        "symbol": symbol,
+        "name": record.get("name") or symbol,
+        "sector": record.get("sector"),
+        "industry": record.get("industry"),
+        "exchange": record.get("exchange"),
+        "aliases": aliases,
+    }
+
+
+def entry_from_failure(symbol, failed_at=None):
+    return {
+        "symbol": symbol, "name": symbol, "sector": None, "industry": None, "exchange": None,
+        "aliases": [], "failed_at": failed_at or time.time(),
+    }
+
+
+class SymbolIndex:
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+        self._build()
+
+    def _build(self):
+        keys = []
+        trigrams = {}
+        gram_counts = {}
+        for symbol, entry in self.entries.items():
+            texts = [symbol, entry.get("name")] + list(entry.get("aliases") or [])
+            grams = set()
+            for text in filter(None, texts):
+                norm = _normalize(text)
+                if not norm:
+                    continue
+                # Every word starts a key too, so "machines" finds IBM
+                words = norm.split()
+                for i in range(len(words)):
+                    keys.append((" ".join(words[i:]), symbol))
+                grams |= _trigrams(norm)
+            for gram in grams:
+                trigrams.setdefault(gram, []).append(len(gram_counts))
+            gram_counts[symbol] = len(grams)
+        keys.sort()
+        self._keys = [k for k, _ in keys]
+        self._key_symbols = [s for _, s in keys]
+        # Trigram postings as integer arrays so fuzzy scoring is one bincount
+        self._symbols = list(gram_counts)
+        self._gram_counts = np.fromiter(gram_counts.values(), dtype=np.int32, count=len(gram_counts))
+        self._trigrams = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in trigrams.items()}
+
+    def __contains__(self, symbol):
+        return symbol in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, symbol):
+        return self.entries.get(symbol)
+
+    def is_due(self, symbol, now=None):
+        """True if ``symbol`` has no entry, or only a failure placeholder old enough to retry."""
+        entry = self.entries.get(symbol)
+        if entry is None:
+            return True
+        failed_at = entry.get("failed_at")
+        return failed_at is not None and (now or time.time()) - failed_at >= FAILED_RETRY_AFTER
+
+    def name(self, symbol, default="N/A"):
+        entry = self.entries.get(symbol)
+        return entry["name"] if entry and entry.get("name") else default
+
+    def prefix(self, query, limit=10):
+        q = _normalize(query)
+        if not q:
+            return []
+        results = []
+        # Exact ticker first, then everything whose key starts with the query
+        exact = query.strip().upper()
+        if exact in self.entries:
+            results.append(exact)
+        i = bisect_left(self._keys, q)
+        while i < len(self._keys) and self._keys[i].startswith(q) and len(results) < limit:
+            symbol = self._key_symbols[i]
+            if symbol not in results:
+                results.append(symbol)
+            i += 1
+        return results[:limit]
+
+    def fuzzy(self, query, limit=10):
+        """Closest symbols by trigram overlap (Jaccard), so typos still match."""
+        q = _normalize(query)
+        if not q:
+            return []
+        grams = _trigrams(q)
+        postings = [self._trigrams[g] for g in grams if g in self._trigrams]
+        if not postings:
+            return []
+        shared = np.bincount(np.concatenate(postings), minlength=len(self._symbols))
+        score = shared / (len(grams) + self._gram_counts - shared)
+        k = min(limit, int((shared > 0).sum()))
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.lexsort((top, -score[top]))]
+        return [self._symbols[i] for i in top]
+
+    def search(self, query, limit=10):
+        """Typeahead: prefix matches first, topped up with fuzzy matches."""
+        results = self.prefix(query, limit)
+        if len(results) < limit:
+            results += [s for s in self.fuzzy(query, limit) if s not in results]
+        return results[:limit]
+
+    def save(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(list(self.entries.values()), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entries = []
+        return cls({e["symbol"]: e for e in entries})
+
+
+def get_symbol_index():
+    """The process-wide index, loaded from disk on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SymbolIndex.load()
+        return _index
+
+
+def update_index(records):
+    """Merge fundamentals records into the index and persist it.
+
+    Failed records only add a placeholder for symbols with no real entry.
+    """
+    global _index
+    if not records:
+        return get_symbol_index()
+    with _index_lock:
+        current = _index if _index is not None else SymbolIndex.load()
+        entries = dict(current.entries)
+        for r in records:
+            if r.get("status", "ok") == "ok":
+                entries[r["symbol"]] = entry_from_record(r)
+            elif r["symbol"] not in entries or "failed_at" in entries[r["symbol"]]:
+                entries[r["symbol"]] = entry_from_failure(r["symbol"])
+        _index = SymbolIndex(entries)
+        _index.save()
+        return _index
+
+
+def ensure_symbols(symbols):
+    """Make sure every symbol has an entry, preferring records already on disk."""
+    index = get_symbol_index()
+    now = time.time()
+    missing = [s for s in symbols if index.is_due(s, now)]
+    if not missing:
+        return index
+
+    records = [record for record, _ in disk_cache.read_latest(missing).values()]
+    still_missing = set(missing) - {r["symbol"] for r in records}
+    if still_missing:
+        # Whatever is left goes through the disk cache's shared fetch; failed
+        # symbols come back with their status and get a placeholder entry
+        records += disk_cache.get_many(sorted(still_missing), fetch_bulk_stock_info)
+    return update_index(records)
+
+
+def get_symbol_names(tickers):
+    index = ensure_symbols(list(tickers))
+    return {t: index.name(t) for t in tickers}
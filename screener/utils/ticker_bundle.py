@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from utils import disk_cache, shared_cache
+from utils.data_loader import derive_fundamentals
+from utils.fetch_scheduler import is_rate_limited
+from utils.market_data import get_provider
+from utils.price_store import get_history
+
+# Everything one analysis view needs for a ticker, fetched once. Concurrent
+# callers for the same ticker wait on the same in-flight fetch, and the
+# finished bundle is reused for BUNDLE_TTL seconds by every session.
+BUNDLE_TTL = 300
+MAX_BUNDLES = 256
+
+_bundles = OrderedDict()
+_inflight = {}
+_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+class TickerBundle:
+    def __init__(self, ticker, info):
+        self.ticker = ticker
+        self.info = info
+        self.created = time.time()
+        self._income_stmt = None
+        self._fundamentals = None
+        self._stmt_lock = threading.Lock()
+
+    def income_stmt(self):
+        # Statements are only needed for some PEG fallbacks, so fetch lazily
+        with self._stmt_lock:
+            if self._income_stmt is None:
+                self._income_stmt = get_provider().income_stmt(self.ticker)
+            return self._income_stmt
+
+    def _derive(self, ticker):
+        try:
+            return dict(derive_fundamentals(ticker, self.info, self.income_stmt), status="ok", error=None)
+        except Exception as exc:
+            # Same failed record as the bulk fetch; it is not written to disk
+            logger.warning("Fundamentals for %s failed: %s", ticker, exc)
+            return {"symbol": ticker, "status": "rate_limited" if is_rate_limited(exc) else "error",
+                    "error": f"{type(exc).__name__}: {exc}"}
+
+    @property
+    def fundamentals(self):
+        """The fundamentals record, derived from this bundle's ``info``.
+
+        A disk cache record is only used if it is at most as old as a bundle,
+        so it is no staler than the price and chart beside it; otherwise the
+        record is derived here and written back, so the screener sees the same
+        values. A failed derivation returns a record with an error ``status``
+        and is retried on the next access.
+        """
+        if self._fundamentals is None:
+            record = disk_cache.get_one(self.ticker, self._derive, fresh_ttl=BUNDLE_TTL, stale_ttl=BUNDLE_TTL)
+            if record.get("status", "ok") != "ok":
+                return record
+            self._fundamentals = record
+        return self._fundamentals
+
+    def refresh_fundamentals(self):
+        """Derive the record from ``info`` now and write it back, whatever the disk cache holds."""
+        record = self._derive(self.ticker)
+        if record["status"] == "ok":
+            disk_cache.write_records([record])
+            self._fundamentals = record
+        return record
+
+    @property
+    def peg_ratio(self):
+        return self.fundamentals.get("peg_ratio")
+
+    def history(self, period, interval):
+        return get_history(self.ticker, period, interval)
+
+
+def get_ticker_bundle(ticker, ttl=BUNDLE_TTL):
+    """The shared bundle for ``ticker``, fetching it at most once at a time."""
+    with _lock:
+        bundle = _bundles.get(ticker)
+        if bundle is not None and time.time() - bundle.created < ttl:
+            _bundles.move_to_end(ticker)
+            return bundle
+        future = _inflight.get(ticker)
+        leader = future is None
+        if leader:
+            future = _inflight[ticker] = Future()
+
+    if not leader:
+        return future.result()
+
+    try:
+        # Other worker processes fetching the same ticker reuse this .info
+        info = shared_cache.get_or_compute(
+            "info", ticker, lambda: get_provider().info(ticker), ttl=BUNDLE_TTL, max_age=ttl
+        )
+        bundle = TickerBundle(ticker, info)
+    except Exception as exc:
+        with _lock:
+            _inflight.pop(ticker, None)
+        future.set_exception(exc)
+        raise
+
+    with _lock:
+        _bundles[ticker] = bundle
+        _bundles.move_to_end(ticker)
+        while len(_bundles) > MAX_BUNDLES:
+            _bundles.popitem(last=False)
+        _inflight.pop(ticker, None)
+    future.set_result(bundle)
+    return bundle
@@ -0,0 +1,115 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+
+import streamlit as st
+
+from utils.data_loader import get_dow30_tickers
+from utils.disk_cache import CACHE_DIR
+
+# Named ticker universes. "dow30" is built in; any other universe is a
+# constituent file dropped into screener/universes/, e.g. sp500.csv or
+# russell3000.csv, with a "symbol" column (a "name" column is optional).
+UNIVERSE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "universes")
+VERSION_LOG_PATH = os.path.join(CACHE_DIR, "universe_versions.json")
+DEFAULT_UNIVERSE = "dow30"
+
+UNIVERSE_LABELS = {
+    "dow30": "Dow 30",
+    "sp500": "S&P 500",
+    "russell3000": "Russell 3000",
+}
+
+_log_lock = threading.Lock()
+
+
+def list_universes():
+    names = [DEFAULT_UNIVERSE]
+    if os.path.isdir(UNIVERSE_DIR):
+        names += sorted(
+            os.path.splitext(f)[0] for f in os.listdir(UNIVERSE_DIR)
+            if f.endswith(".csv") and os.path.splitext(f)[0] != DEFAULT_UNIVERSE
+        )
+    return names
+
+
+def universe_label(name):
+    return UNIVERSE_LABELS.get(name, name)
+
+
+def _read_constituents(path):
+    with open(path, newline="") as f:
+        rows = csv.DictReader(f)
+        symbols = [(row.get("symbol") or row.get("Symbol") or "").strip().upper() for row in rows]
+    # Yahoo spells share classes with a dash (BRK-B), index files often use a dot
+    return sorted({s.replace(".", "-") for s in symbols if s})
+
+
+def membership_version(symbols):
+    return hashlib.sha1(",".join(sorted(symbols)).encode()).hexdigest()[:12]
+
+
+def _record_version(name, symbols, version):
+    # Append-only history of membership changes per universe
+    with _log_lock:
+        try:
+            with open(VERSION_LOG_PATH) as f:
+                log = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            log = {}
+
+        history = log.setdefault(name, [])
+        if history and history[-1]["version"] == version:
+            return
+        previous = set(history[-1]["symbols"]) if history else set()
+        history.append({
+            "version": version,
+            "effective": time.strftime("%Y-%m-%d"),
+            "count": len(symbols),
+            "added": sorted(set(symbols) - previous),
+            "removed": sorted(previous - set(symbols)),
+            "symbols": list(symbols),
+        })
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{VERSION_LOG_PATH}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(log, f)
+        os.replace(tmp, VERSION_LOG_PATH)
+
+
+@st.cache_data(ttl=3600)
+def get_universe(name=DEFAULT_UNIVERSE):
+    """Return {"name", "symbols", "version"} for a named universe."""
+    if name == DEFAULT_UNIVERSE:
+        symbols = sorted(get_dow30_tickers())
+    else:
+        path = os.path.join(UNIVERSE_DIR, f"{name}.csv")
+        if not os.path.exists(path):
+            raise KeyError(f"Unknown universe: {name!r}")
+        symbols = _read_constituents(path)
+
+    version = membership_version(symbols)
+    _record_version(name, symbols, version)
+    return {"name": name, "symbols": symbols, "version": version}
+
+
+def get_universe_history(name):
+    try:
+        with open(VERSION_LOG_PATH) as f:
+            return json.load(f).get(name, [])
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def select_universe():
+    """Sidebar picker shared by every page; the choice sticks across pages."""
+    names = list_universes()
+    if st.session_state.get("universe") not in names:
+        st.session_state["universe"] = DEFAULT_UNIVERSE
+    if len(names) > 1:
+        st.sidebar.selectbox("🌐 Universe", names, format_func=universe_label, key="universe")
+    return get_universe(st.session_state["universe"])
@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+import time
+
+import streamlit as st
+
+from utils.disk_cache import FRESH_TTL
+from utils.fetch_scheduler import get_scheduler
+from utils.indicators import indicator_frame
+from utils.price_store import REFRESH_AFTER, is_current, update
+from utils.refresh import refresh_incremental
+from utils.shared_cache import get, lease, put, scan
+from utils.symbol_index import ensure_symbols
+from utils.ticker_bundle import BUNDLE_TTL, get_ticker_bundle
+from utils.universes import DEFAULT_UNIVERSE, get_universe, list_universes
+
+# Background warm-up: keeps fundamentals, per-ticker bundles, chart bars and
+# symbol metadata for the universes in use fresher than the pages' own TTLs,
+# so a page render reads from disk instead of waiting on Yahoo.
+WARM_INTERVAL = int(os.environ.get("LYNCH_WARM_INTERVAL", 240))   # seconds between cycles
+INDEX_TICKER = "^DJI"
+# Allowance for a cycle's own run time when deciding which bars are due
+CYCLE_MARGIN = 30
+
+# Refetch fundamentals before disk_cache considers them stale
+FUNDAMENTALS_MAX_AGE = FRESH_TTL * 3 // 4
+
+# (interval, period) pairs the chart pages ask for, at their longest range
+CHART_SPECS = [("5m", "5d"), ("1h", "1mo"), ("1d", "1y"), ("1wk", "5y")]
+CHART_INDICATORS = [("sma", 20), ("sma", 50)]
+# Intraday bars go stale every few minutes; only keep them warm for small universes
+INTRADAY_MEMBER_LIMIT = 100
+# Same for the per-ticker .info bundles Stock Analysis and the Screener read;
+# the default universe is always kept warm
+BUNDLE_MEMBER_LIMIT = 100
+# Every worker runs a warmer, but only the one holding the lease runs a cycle;
+# universes and freshness live in the shared cache so all of them see both
+CYCLE_LEASE_TTL = 1800
+STATE_TTL = 7 * 86400
+
+logger = logging.getLogger(__name__)
+
+
+class Warmer:
+    def __init__(self, interval=WARM_INTERVAL):
+        self.interval = interval
+        self.universes = {DEFAULT_UNIVERSE}
+        self.state = {"phase": "idle", "done": 0, "total": 0, "cycle_started": None, "failed": []}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def track(self, name):
+        """Keep ``name`` warm too; a universe seen for the first time is warmed right away."""
+        with self._lock:
+            if name in self.universes:
+                return
+            self.universes.add(name)
+        put("warmup", f"universe:{name}", time.time(), STATE_TTL)
+        self._wake.set()
+
+    def status(self):
+        warmed_at = {key.split(":", 1)[1]: at for key, at in scan("warmup", "warmed_at:").items()}
+        with self._lock:
+            return dict(self.state, warmed_at=warmed_at)
+
+    def _progress(self, phase=None, done=0, total=None):
+        with self._lock:
+            if phase is not None:
+                self.state["phase"] = phase
+                self.state["done"] = 0
+            self.state["done"] += done
+            if total is not None:
+                self.state["total"] = total
+
+    def _price_specs(self, symbols):
+        specs = [(INDEX_TICKER, interval, period) for interval, period in CHART_SPECS]
+        member_specs = CHART_SPECS if len(symbols) <= INTRADAY_MEMBER_LIMIT else [("1d", "1y")]
+        specs += [(s, interval, period) for interval, period in member_specs for s in symbols]
+        return specs
+
+    def _due_age(self, threshold):
+        # Anything skipped now is next looked at a whole cycle later, so
+        # refresh whatever would pass the page's threshold before then. Data
+        # whose threshold is shorter than that gets refreshed every cycle; a
+        # page only finds it stale if a cycle overruns CYCLE_MARGIN.
+        return max(0, threshold - self.interval - CYCLE_MARGIN)
+
+    def _max_age(self, interval):
+        return self._due_age(REFRESH_AFTER.get(interval, 3600))
+
+    def _bundle_symbols(self, names):
+        symbols = {INDEX_TICKER}
+        for name in names:
+            members = get_universe(name)["symbols"]
+            if name == DEFAULT_UNIVERSE or len(members) <= BUNDLE_MEMBER_LIMIT:
+                symbols.update(members)
+        return sorted(symbols)
+
+    def _warm_bundle(self, ticker):
+        # The bundle's .info lands in the shared cache for every worker, and
+        # the fundamentals derived from it on disk
+        bundle = get_ticker_bundle(ticker, ttl=self._due_age(BUNDLE_TTL))
+        if ticker != INDEX_TICKER:
+            record = bundle.refresh_fundamentals()
+            if record["status"] != "ok":
+                raise RuntimeError(record["error"])
+
+    def _warm_bars(self, spec):
+        ticker, interval, period = spec
+        update(ticker, interval, period, max_age=self._max_age(interval))
+        indicator_frame(ticker, interval, CHART_INDICATORS)
+
+    def run_cycle(self):
+        with lease("warmup", "cycle", CYCLE_LEASE_TTL, wait=False) as token:
+            if token is None:
+                return False
+            self._run_cycle()
+            return True
+
+    def _run_cycle(self):
+        shared = {key.split(":", 1)[1] for key in scan("warmup", "universe:")}
+        with self._lock:
+            self.universes |= shared
+            # A universe file removed since it was tracked is dropped quietly
+            names = sorted(self.universes & set(list_universes()))
+            self.state.update(cycle_started=time.time(), failed=[])
+        symbols = sorted({s for name in names for s in get_universe(name)["symbols"]})
+
+        self._progress("fundamentals", total=len(symbols))
+        result = refresh_incremental(symbols, max_age=FUNDAMENTALS_MAX_AGE)
+        self._progress(done=len(symbols))
+
+        self._progress("metadata", total=len(symbols))
+        ensure_symbols(symbols)
+        self._progress(done=len(symbols))
+
+        bundles = [s for s in self._bundle_symbols(names)
+                   if get("info", s, max_age=self._due_age(BUNDLE_TTL)) is None]
+        self._progress("bundles", total=len(bundles))
+        failed = list(result["failed"])
+        for outcome in get_scheduler().run(bundles, self._warm_bundle):
+            if outcome["status"] != "ok":
+                failed.append(outcome["key"])
+            self._progress(done=1)
+
+        # Only bars that are due go through the scheduler and spend rate-limit tokens
+        specs = [spec for spec in self._price_specs(symbols)
+                 if not is_current(*spec, max_age=self._max_age(spec[1]))]
+        self._progress("prices", total=len(specs))
+        for outcome in get_scheduler().run(specs, self._warm_bars):
+            if outcome["status"] != "ok":
+                failed.append(outcome["key"][0])
+            self._progress(done=1)
+
+        now = time.time()
+        with self._lock:
+            self.state.update(phase="idle", failed=sorted(set(failed)))
+        for name in names:
+            put("warmup", f"warmed_at:{name}", now, STATE_TTL)
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_cycle()
+            except Exception:
+                # A bad cycle must not kill the worker; the pages still fetch on a miss
+                logger.exception("Cache warm-up cycle failed")
+                self._progress("idle")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="lynch-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+
+@st.cache_resource
+def get_warmer():
+    # One warm-up thread per server process, shared by every session
+    return Warmer().start()
+
+
+def show_warmup_status(universe=DEFAULT_UNIVERSE):
+    """Sidebar line with warm-up progress or data age, shown instead of a spinner."""
+    warmer = get_warmer()
+    warmer.track(universe)
+    status = warmer.status()
+    warmed_at = status["warmed_at"].get(universe)
+    if status["phase"] != "idle" and status["total"]:
+        st.sidebar.progress(min(1.0, status["done"] / status["total"]),
+                            text=f"Refreshing {status['phase']} ({status['done']}/{status['total']})")
+    if warmed_at:
+        st.sidebar.caption(f"Data refreshed {int((time.time() - warmed_at) // 60)} min ago")
+    if status["failed"]:
+        st.sidebar.caption(f"Could not refresh: {', '.join(status['failed'][:10])}")